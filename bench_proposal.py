@@ -0,0 +1,318 @@
+"""
+Benchmark harness for the proposal pipeline.
+
+Drives /generate_proposal and /generate_proposal_word through the Flask test
+client with a fixed corpus of payloads and reports, per payload and format:
+latency, per-stage timings, peak Python allocations and output size, plus
+throughput under N concurrent clients.
+
+    python bench_proposal.py                          # run and print
+    python bench_proposal.py --save bench_baseline.json
+    python bench_proposal.py --compare bench_baseline.json --threshold 0.15
+
+Relative paths are taken from the app directory. bench_baseline.json is a
+reference run on a 1-CPU container; save a new one on the machine you
+compare on.
+
+--compare exits with status 1 if any median latency or throughput is worse
+than the baseline by more than the threshold.
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+# Measure rendering, not the result and page group caches (pdf/edit_one_fee turns the latter on)
+os.environ.setdefault('PROPOSAL_RESULT_CACHE_MB', '0')
+os.environ.setdefault('PROPOSAL_PAGE_GROUP_CACHE_MB', '0')
+os.environ.pop('PROPOSAL_RESULT_CACHE_DIR', None)
+# Per-request log lines would be timed along with the renders
+os.environ.setdefault('PROPOSAL_LOG_LEVEL', 'WARNING')
+
+ENDPOINTS = {'pdf': '/generate_proposal', 'docx': '/generate_proposal_word'}
+
+
+# ==================== CORPUS ====================
+def build_corpus():
+    """Representative payloads, keyed by name"""
+    from proposal_model import SECTIONS
+
+    minimal = {'clientName': 'John Smith', 'clientCompany': 'Tiny Co', 'proposalDate': '2026-01-15'}
+
+    all_services = dict(minimal, clientName='Jane Doe', clientCompany='Acme Widgets Pvt Ltd',
+                        clientDesignation='CFO', clientAddress='1 Residency Road, Bengaluru',
+                        companyYear='2019', scopeOfServices='Accounting, payroll and statutory compliance.')
+    for section in SECTIONS.values():
+        for service in section.services:
+            all_services[service.toggle] = 'on'
+            all_services[service.fee_key] = '1500'
+            if service.frequency_key:
+                all_services[service.frequency_key] = 'Monthly'
+
+    long_scope = dict(all_services, scopeOfServices='\n'.join(
+        f'• Workstream {i}: monthly bookkeeping, GST returns, TDS filings and statutory '
+        f'registers for the group entity, with quarterly reviews and year-end support.' for i in range(60)))
+
+    # A tier table sits inside one fee-table cell and cannot split across
+    # pages, so 15 rows per table is about the most a proposal can hold
+    many_tiers = dict(all_services)
+    for section in SECTIONS.values():
+        for service in section.services:
+            if service.tiers is not None:
+                many_tiers[service.tiers.entries_key] = [
+                    {key: f'{i * 10} - {i * 10 + 10}' if n == 0 else str(100 + i * 5)
+                     for n, (key, _) in enumerate(service.tiers.fields)}
+                    for i in range(15)]
+
+    return {'minimal': minimal, 'all_services': all_services, 'long_scope': long_scope, 'many_tiers': many_tiers}
+
+
+# ==================== STAGE TIMING ====================
+class StageTimer:
+    """Wall time per pipeline stage, accumulated for the current thread"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def reset(self):
+        self._local.stages = {}
+
+    def stages(self):
+        return dict(getattr(self._local, 'stages', {}))
+
+    def wrap(self, stage, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stages = getattr(self._local, 'stages', None)
+                if stages is not None:
+                    stages[stage] = stages.get(stage, 0.0) + time.perf_counter() - started
+        return timed
+
+
+def instrument(app_module, timer):
+    """Wrap the pipeline functions of app.py so their time is recorded per stage"""
+    from reportlab.platypus import SimpleDocTemplate
+
+    app_module.build_proposal_model = timer.wrap('model', app_module.build_proposal_model)
+    app_module.build_group_elements = timer.wrap('elements', app_module.build_group_elements)
+    app_module.splice_proposal = timer.wrap('merge', app_module.splice_proposal)
+    SimpleDocTemplate.build = timer.wrap('layout', SimpleDocTemplate.build)
+    for kind in list(app_module.RENDERERS):
+        app_module.RENDERERS[kind] = timer.wrap('render', app_module.RENDERERS[kind])
+    docx_export = app_module.load_module('docx_export')
+    docx_export.render_proposal_docx = timer.wrap('docx_write', docx_export.render_proposal_docx)
+
+
+def derive_stages(stages, total):
+    """Split the nested timings into exclusive stages that add up to the request time"""
+    render = stages.pop('render', 0.0)
+    merge = stages.pop('merge', 0.0)
+    result = {name: seconds for name, seconds in stages.items()}
+    if 'layout' in stages:
+        # Parsing the dynamic PDF back for the splice is part of the merge
+        result['merge'] = render - stages.get('elements', 0.0) - stages['layout']
+    elif merge:
+        result['merge'] = merge
+    result['response'] = total - render - stages.get('model', 0.0)
+    return result
+
+
+# ==================== RUNS ====================
+def timed_request(client, timer, kind, payload):
+    timer.reset()
+    started = time.perf_counter()
+    response = client.post(ENDPOINTS[kind], json=payload)
+    size = len(response.data)
+    total = time.perf_counter() - started
+    if response.status_code != 200:
+        raise RuntimeError(f'{ENDPOINTS[kind]} returned {response.status_code}: {response.data[:200]!r}')
+    return total, derive_stages(timer.stages(), total), size
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def bench_payload(app_module, timer, kind, payload, iterations, edit=None):
+    """Latency of one payload; edit(payload, i), if given, changes it before each timed request"""
+    client = app_module.app.test_client()
+    cold, _, size = timed_request(client, timer, kind, payload)
+    totals, stage_runs = [], []
+    for i in range(iterations):
+        total, stages, size = timed_request(client, timer, kind, edit(payload, i) if edit else payload)
+        totals.append(total)
+        stage_runs.append(stages)
+
+    tracemalloc.start()
+    timed_request(client, timer, kind, payload)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    stage_names = sorted({name for stages in stage_runs for name in stages})
+    return {
+        'cold_ms': round(cold * 1000, 2),
+        'median_ms': round(statistics.median(totals) * 1000, 2),
+        'p95_ms': round(percentile(totals, 0.95) * 1000, 2),
+        'stages_ms': {name: round(statistics.median(stages.get(name, 0.0) for stages in stage_runs) * 1000, 2)
+                      for name in stage_names},
+        'peak_alloc_mb': round(peak / 1e6, 2),
+        'size_bytes': size,
+    }
+
+
+def bench_edits(app_module, timer, payload, iterations):
+    """Iterative editing: one compliance fee changes per request, the cover and letter come from the cache"""
+    cache = app_module.page_group_cache
+    max_bytes, cache.max_bytes = cache.max_bytes, 64 * 1024 * 1024
+    try:
+        return bench_payload(app_module, timer, 'pdf', payload, iterations,
+                             edit=lambda payload, i: dict(payload, advanceTaxFee=str(1000 + i)))
+    finally:
+        cache.max_bytes = max_bytes
+
+
+def bench_concurrency(app_module, timer, kind, corpus, clients, requests_per_client):
+    """N threads, each with its own test client, cycling through the corpus"""
+    payloads = list(corpus.values())
+
+    def run_client(n):
+        client = app_module.app.test_client()
+        latencies = []
+        for i in range(requests_per_client):
+            total, _, _ = timed_request(client, timer, kind, payloads[(n + i) % len(payloads)])
+            latencies.append(total)
+        return latencies
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = [latency for result in pool.map(run_client, range(clients)) for latency in result]
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+    }
+
+
+def run(args):
+    import app as app_module
+    import reportlab
+    timer = StageTimer()
+    instrument(app_module, timer)
+    corpus = build_corpus()
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'reportlab': reportlab.Version,
+            'cpus': os.cpu_count(),
+            'iterations': args.iterations,
+            'lazy_imports': app_module.LAZY_IMPORTS,
+            # Styles, fonts and static PDFs are set up once at import
+            'startup_ms': {step: round(seconds * 1000, 1) for step, seconds in app_module.STARTUP_TIMES.items()},
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'payloads': {},
+        'concurrency': {},
+    }
+    for kind in args.formats:
+        for name, payload in corpus.items():
+            report['payloads'][f'{kind}/{name}'] = bench_payload(app_module, timer, kind, payload, args.iterations)
+        if kind == 'pdf':
+            report['payloads']['pdf/edit_one_fee'] = bench_edits(
+                app_module, timer, corpus['all_services'], args.iterations)
+        for clients in args.concurrency:
+            report['concurrency'][f'{kind}/{clients}'] = bench_concurrency(
+                app_module, timer, kind, corpus, clients, args.requests_per_client)
+    report['meta']['max_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return report
+
+
+# ==================== REPORTING ====================
+def print_report(report):
+    meta = report['meta']
+    print(f"Python {meta['python']}, ReportLab {meta['reportlab']}, {meta['cpus']} CPUs, "
+          f"{meta['iterations']} iterations, max RSS {meta['max_rss_mb']} MB")
+    print(f"\n{'payload':<22}{'cold':>9}{'median':>9}{'p95':>9}{'alloc MB':>10}{'size KB':>9}  stages (ms)")
+    for key, result in report['payloads'].items():
+        stages = ', '.join(f'{name} {ms:.1f}' for name, ms in result['stages_ms'].items())
+        print(f"{key:<22}{result['cold_ms']:>9.1f}{result['median_ms']:>9.1f}{result['p95_ms']:>9.1f}"
+              f"{result['peak_alloc_mb']:>10.2f}{result['size_bytes'] / 1024:>9.0f}  {stages}")
+    print(f"\n{'clients':<22}{'req/s':>9}{'p50':>9}{'p95':>9}")
+    for key, result in report['concurrency'].items():
+        print(f"{key:<22}{result['throughput_rps']:>9.2f}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}")
+
+
+def compare(report, baseline, threshold):
+    """Print changes against a baseline report; return the regressions beyond threshold"""
+    regressions = []
+    print(f"\nCompared with baseline from {baseline['meta'].get('created', '?')} (threshold {threshold:.0%}):")
+    for key, result in report['payloads'].items():
+        old = baseline['payloads'].get(key)
+        if old is None:
+            continue
+        change = result['median_ms'] / old['median_ms'] - 1
+        flag = '  REGRESSION' if change > threshold else ''
+        print(f"  {key:<22} median {old['median_ms']:>8.1f} -> {result['median_ms']:>8.1f} ms ({change:+.1%}){flag}")
+        if flag:
+            regressions.append(key)
+    for key, result in report['concurrency'].items():
+        old = baseline['concurrency'].get(key)
+        if old is None:
+            continue
+        change = result['throughput_rps'] / old['throughput_rps'] - 1
+        flag = '  REGRESSION' if -change > threshold else ''
+        print(f"  {key:<22} req/s  {old['throughput_rps']:>8.2f} -> {result['throughput_rps']:>8.2f}    ({change:+.1%}){flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the proposal pipeline')
+    parser.add_argument('--iterations', type=int, default=10, help='timed requests per payload (after one cold request)')
+    parser.add_argument('--formats', type=lambda s: s.split(','), default=['pdf', 'docx'], help='comma-separated: pdf,docx')
+    parser.add_argument('--concurrency', type=lambda s: [int(n) for n in s.split(',')], default=[1, 4],
+                        help='comma-separated client counts for the throughput runs')
+    parser.add_argument('--requests-per-client', type=int, default=5)
+    parser.add_argument('--save', metavar='PATH', help='write the report as JSON (e.g. a new baseline)')
+    parser.add_argument('--compare', metavar='PATH', help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.15, help='allowed slowdown before flagging (0.15 = 15%%)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    print_report(report)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved report to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    # Relative --save and --compare paths are taken from the app directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.getcwd())
+    sys.exit(main())
@@ -0,0 +1,468 @@
+"""Native Word export of the proposal with python-docx.
+
+DocxProposalWriter walks the same flowables the PDF backend builds and
+writes them as Word paragraphs and tables; the static pages are spliced in
+from DOCX fragments pre-built from the static PDF inserts. app.py imports
+this module on first use, so python-docx is only loaded by the Word path.
+"""
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+import uuid
+from copy import deepcopy
+from functools import lru_cache
+
+from docx import Document
+from docx.enum.section import WD_HEADER_FOOTER, WD_SECTION
+from docx.enum.table import WD_CELL_VERTICAL_ALIGNMENT
+from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.shared import Inches, Pt, RGBColor
+from PIL import Image as PILImage
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT, TA_RIGHT
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import KeepTogether, PageBreak, Paragraph, Spacer, Table
+
+from telemetry import log
+
+STATIC_DOCX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static_docx')
+# Fragments rebuilt at runtime (after a static PDF is replaced) go here, so the app directory may be read-only
+DOCX_CACHE_DIR = os.environ.get('PROPOSAL_DOCX_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'proposal_docx')
+DOCX_FONT_NAMES = {
+    'MicrosoftSansSerif': 'Microsoft Sans Serif',
+    'Roboto': 'Roboto',
+    'Roboto-Bold': 'Roboto',
+    'Helvetica': 'Arial',
+    'Times': 'Times New Roman',
+    'Courier': 'Courier New',
+}
+DOCX_ALIGNMENT = {
+    TA_LEFT: WD_ALIGN_PARAGRAPH.LEFT,
+    TA_CENTER: WD_ALIGN_PARAGRAPH.CENTER,
+    TA_RIGHT: WD_ALIGN_PARAGRAPH.RIGHT,
+    TA_JUSTIFY: WD_ALIGN_PARAGRAPH.JUSTIFY,
+    'LEFT': WD_ALIGN_PARAGRAPH.LEFT,
+    'CENTER': WD_ALIGN_PARAGRAPH.CENTER,
+    'CENTRE': WD_ALIGN_PARAGRAPH.CENTER,
+    'RIGHT': WD_ALIGN_PARAGRAPH.RIGHT,
+}
+DOCX_VALIGN = {
+    'TOP': WD_CELL_VERTICAL_ALIGNMENT.TOP,
+    'MIDDLE': WD_CELL_VERTICAL_ALIGNMENT.CENTER,
+    'BOTTOM': WD_CELL_VERTICAL_ALIGNMENT.BOTTOM,
+}
+_WHITESPACE = re.compile(r'\s+')
+_RELATIONSHIP_ATTRS = (qn('r:embed'), qn('r:link'), qn('r:id'))
+
+
+def _file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def build_docx_fragment(pdf_path, docx_path):
+    """Convert a static PDF insert into the DOCX fragment spliced into Word exports.
+
+    The source PDF's hash is stored in the fragment's core properties so a
+    replaced PDF is detected regardless of file timestamps.
+    """
+    # pdf2docx pulls in PyMuPDF, OpenCV and NumPy; only fragment rebuilds need it
+    from pdf2docx import Converter
+
+    log.info("🔄 Building Word fragment for %s...", os.path.basename(pdf_path))
+    tmp_path = f'{docx_path}.{uuid.uuid4().hex}.tmp'
+    try:
+        cv = Converter(pdf_path)
+        try:
+            cv.convert(tmp_path, start=0, end=None)
+        finally:
+            cv.close()
+        fragment = Document(tmp_path)
+        fragment.core_properties.identifier = _file_sha256(pdf_path)
+        fragment.save(tmp_path)
+        os.replace(tmp_path, docx_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class DocxFragmentCache:
+    """Pre-built DOCX fragments of the static PDF inserts, loaded once per file version.
+
+    Fragments are looked up in directory, then in the pre-built
+    fallback_directory shipped with the app; a missing or out-of-date
+    fragment is rebuilt into directory. A rebuild takes seconds, so it runs
+    outside the cache lock, once per fragment however many requests wait.
+    """
+
+    def __init__(self, directory, fallback_directory=None):
+        self.directory = directory
+        self.fallback_directory = fallback_directory
+        self._entries = {}
+        self._loading = {}  # pdf path -> lock held while its fragment is loaded or rebuilt
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    def get(self, pdf_path):
+        """Return the fragment Document for a static PDF, or None if there is none"""
+        try:
+            pdf_mtime = os.stat(pdf_path).st_mtime_ns
+        except OSError:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(pdf_path)
+            if entry is not None and entry[0] == pdf_mtime:
+                self.hits += 1
+                return entry[1]
+            loading = self._loading.setdefault(pdf_path, threading.Lock())
+
+        with loading:
+            with self._lock:
+                # Another request may have loaded it while this one waited
+                entry = self._entries.get(pdf_path)
+                if entry is not None and entry[0] == pdf_mtime:
+                    self.hits += 1
+                    return entry[1]
+                self.misses += 1
+            fragment = self._load(pdf_path)
+            if fragment is not None:
+                with self._lock:
+                    self._entries[pdf_path] = (pdf_mtime, fragment)
+            return fragment
+
+    def _load(self, pdf_path):
+        name = os.path.splitext(os.path.basename(pdf_path))[0] + '.docx'
+        docx_path = os.path.join(self.directory, name)
+        pdf_hash = _file_sha256(pdf_path)
+        stale = None
+        for directory in (self.directory, self.fallback_directory):
+            path = os.path.join(directory, name) if directory else None
+            if path and os.path.exists(path):
+                fragment = Document(path)
+                if fragment.core_properties.identifier == pdf_hash:
+                    return fragment
+                log.warning("⚠️ Word fragment %s is out of date", path)
+                stale = stale or fragment
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            build_docx_fragment(pdf_path, docx_path)
+            with self._lock:
+                self.rebuilds += 1
+        except Exception as e:
+            log.warning("⚠️ Could not build Word fragment %s: %s", docx_path, e)
+            return stale
+        return Document(docx_path)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'rebuilds': self.rebuilds}
+
+
+docx_fragment_cache = DocxFragmentCache(DOCX_CACHE_DIR, STATIC_DOCX_DIR)
+
+
+@lru_cache(maxsize=8)
+def _docx_image_bytes(path, mtime_ns):
+    with PILImage.open(path) as image:
+        if image.format in ('PNG', 'JPEG', 'GIF', 'BMP', 'TIFF'):
+            with open(path, 'rb') as f:
+                return f.read()
+        # Word cannot show e.g. the WebP header artwork, so re-encode it once
+        output = io.BytesIO()
+        image.save(output, 'PNG')
+        return output.getvalue()
+
+
+def _docx_image(path):
+    """Image file as a stream python-docx can embed"""
+    return io.BytesIO(_docx_image_bytes(path, os.stat(path).st_mtime_ns))
+
+
+def _docx_font_name(font_name):
+    if font_name in DOCX_FONT_NAMES:
+        return DOCX_FONT_NAMES[font_name]
+    return DOCX_FONT_NAMES.get(font_name.split('-')[0], font_name)
+
+
+def _format_run(run, font_name, font_size, color=None, underline=False):
+    # ReportLab resolves <b>/<i> into the font name, so that is what the PDF shows
+    font = run.font
+    font.name = _docx_font_name(font_name)
+    font.bold = 'Bold' in font_name
+    font.italic = 'Oblique' in font_name or 'Italic' in font_name
+    font.size = Pt(font_size)
+    if color is not None:
+        font.color.rgb = RGBColor.from_string(colors.toColor(color).hexval()[2:].upper())
+    if underline:
+        font.underline = True
+
+
+def _normalize_span(span, ncols, nrows):
+    (sc, sr), (ec, er) = span
+    return (sc % ncols, sr % nrows), (ec % ncols, er % nrows)
+
+
+class DocxProposalWriter:
+    """Writes proposal flowables into a python-docx Document, without any PDF layout.
+
+    Paragraph markup, table spans, cell styles and nested tier tables are
+    taken from the same flowables the PDF backend builds. cover_type is the
+    flowable class of the cover page, header_path the running header image.
+    """
+
+    def __init__(self, doc, cover_type, header_path):
+        self.doc = doc
+        self.cover_type = cover_type
+        self.header_path = header_path
+        self._space_before = 0
+        self._empty_header = None
+
+    # ---------- flowables ----------
+    def add(self, flowables, container=None):
+        container = container if container is not None else self.doc
+        for flowable in flowables:
+            if isinstance(flowable, Paragraph):
+                self._add_paragraph(container, flowable)
+            elif isinstance(flowable, Table):
+                self._add_table(container, flowable)
+            elif isinstance(flowable, Spacer):
+                self._space_before += flowable.height
+            elif isinstance(flowable, PageBreak):
+                self.doc.add_page_break()
+                self._space_before = 0
+            elif isinstance(flowable, self.cover_type):
+                self._add_cover(flowable)
+            elif isinstance(flowable, KeepTogether):
+                self.add(flowable._content, container)
+            elif isinstance(flowable, (list, tuple)):
+                self.add(flowable, container)
+            else:
+                log.warning("⚠️ Word export skips %s", flowable.__class__.__name__)
+
+    def _add_paragraph(self, container, para):
+        style = para.style
+        p = container.add_paragraph()
+        fmt = p.paragraph_format
+        fmt.alignment = DOCX_ALIGNMENT.get(style.alignment)
+        fmt.space_before = Pt(style.spaceBefore + self._space_before)
+        fmt.space_after = Pt(style.spaceAfter)
+        fmt.line_spacing = Pt(style.leading)
+        fmt.line_spacing_rule = WD_LINE_SPACING.AT_LEAST
+        if style.leftIndent:
+            fmt.left_indent = Pt(style.leftIndent)
+        self._space_before = 0
+
+        at_line_start = True
+        for frag in para.frags:
+            if getattr(frag, 'lineBreak', False):
+                p.add_run().add_break()
+                at_line_start = True
+                continue
+            text = _WHITESPACE.sub(' ', getattr(frag, 'text', ''))
+            if at_line_start:
+                text = text.lstrip()
+            if not text:
+                continue
+            at_line_start = text.endswith(' ')
+            underline = any(line[1] == 'underline' for line in getattr(frag, 'us_lines', ()))
+            _format_run(p.add_run(text), frag.fontName, frag.fontSize, frag.textColor, underline)
+        return p
+
+    def _add_table(self, container, table):
+        nrows, ncols = table._nrows, table._ncols
+        t = container.add_table(rows=nrows, cols=ncols)
+        t.style = 'Table Grid'
+        t.autofit = False
+
+        covered = set()
+        for _, start, end in table._spanCmds:
+            (sc, sr), (ec, er) = _normalize_span((start, end), ncols, nrows)
+            t.cell(sr, sc).merge(t.cell(er, ec))
+            covered.update((r, c) for r in range(sr, er + 1) for c in range(sc, ec + 1) if (r, c) != (sr, sc))
+
+        for r, row in enumerate(t.rows):
+            cells = row.cells
+            for c in range(ncols):
+                cells[c].width = Pt(table._colWidths[c])
+                if (r, c) in covered:
+                    continue
+                self._fill_cell(cells[c], table._cellvalues[r][c], table._cellStyles[r][c])
+        self._space_before = 0
+        return t
+
+    def _fill_cell(self, cell, value, cell_style):
+        cell.vertical_alignment = DOCX_VALIGN.get(cell_style.valign)
+        if isinstance(value, str):
+            p = cell.paragraphs[0]
+            p.paragraph_format.alignment = DOCX_ALIGNMENT.get(cell_style.alignment)
+            if value:
+                _format_run(p.add_run(value), cell_style.fontname, cell_style.fontsize, cell_style.color)
+            return
+
+        self.add(value if isinstance(value, (list, tuple)) else [value], cell)
+        first = cell.paragraphs[0]
+        if len(cell._tc) > 2 and not first.text and not first.runs:
+            # Drop the placeholder paragraph python-docx creates in every new cell
+            first._p.getparent().remove(first._p)
+
+    def _add_cover(self, cover):
+        p = self.doc.add_paragraph()
+        p.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        if os.path.exists(cover.image_path):
+            p.add_run().add_picture(_docx_image(cover.image_path), height=Inches(8.3))
+
+        p = self.doc.add_paragraph()
+        p.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        p.paragraph_format.space_before = Pt(12)
+        _format_run(p.add_run(cover.company_name), 'MicrosoftSansSerif', 20, colors.HexColor('#C00000'))
+
+    # ---------- sections ----------
+    def start_dynamic_section(self):
+        """Give the current section the InCorp header and the running page footer"""
+        section = self.doc.sections[-1]
+        section.page_width, section.page_height = Pt(letter[0]), Pt(letter[1])
+        section.left_margin = section.right_margin = Inches(0.5)
+        section.top_margin, section.bottom_margin = Inches(1.2), Inches(1)
+        section.header_distance, section.footer_distance = Inches(0.2), Inches(0.2)
+
+        header = section.header
+        header.is_linked_to_previous = False
+        if os.path.exists(self.header_path):
+            header.paragraphs[0].add_run().add_picture(_docx_image(self.header_path), width=Inches(7.5))
+
+        footer = section.footer
+        footer.is_linked_to_previous = False
+        p = footer.paragraphs[0]
+        _format_run(p.add_run('www.incorp.asia    Page '), 'Helvetica', 8, colors.HexColor('#C00000'))
+        self._add_field(p, 'PAGE', 'Helvetica', 8, colors.HexColor('#C00000'))
+        _format_run(p.add_run(' of '), 'Helvetica', 8, colors.HexColor('#C00000'))
+        self._add_field(p, 'NUMPAGES', 'Helvetica', 8, colors.HexColor('#C00000'))
+        for text, color in (("© In.Corp Global Pte Ltd. All Right Reserved.", '#666666'),
+                            ("This document is being furnished to you on a confidential basis and solely for your information.", '#999999')):
+            p = footer.add_paragraph()
+            p.paragraph_format.space_after = Pt(0)
+            _format_run(p.add_run(text), 'Helvetica', 7, colors.HexColor(color))
+
+    def _add_field(self, paragraph, instruction, font_name, font_size, color):
+        field = OxmlElement('w:fldSimple')
+        field.set(qn('w:instr'), instruction)
+        run = paragraph.add_run('1')
+        _format_run(run, font_name, font_size, color)
+        run._r.addprevious(field)
+        field.append(run._r)
+
+    def append_fragment(self, fragment):
+        """Splice a pre-built DOCX fragment (one section per static page) into the document"""
+        body = self.doc.element.body
+        self.doc.add_section(WD_SECTION.NEW_PAGE)
+        anchor = body.sectPr
+        rid_map = {}
+        last_sectPr = None
+        for child in fragment.element.body.iterchildren():
+            if child.tag == qn('w:sectPr'):
+                last_sectPr = child
+                continue
+            element = deepcopy(child)
+            self._relink(element, fragment.part, rid_map)
+            for sectPr in element.iter(qn('w:sectPr')):
+                self._blank_header_footer(sectPr)
+            anchor.addprevious(element)
+
+        if last_sectPr is not None:
+            # The fragment's body-level section becomes the section of its last paragraph
+            closing = self.doc.add_paragraph()
+            sectPr = deepcopy(last_sectPr)
+            self._blank_header_footer(sectPr)
+            closing._p.get_or_add_pPr().append(sectPr)
+
+    def _relink(self, element, source_part, rid_map):
+        for node in element.iter():
+            for attr in _RELATIONSHIP_ATTRS:
+                rid = node.get(attr)
+                if rid is None:
+                    continue
+                if rid not in rid_map:
+                    rel = source_part.rels.get(rid)
+                    if rel is None:
+                        rid_map[rid] = None
+                    elif rel.is_external:
+                        rid_map[rid] = self.doc.part.relate_to(rel.target_ref, rel.reltype, is_external=True)
+                    elif rel.reltype == RT.IMAGE:
+                        rid_map[rid], _ = self.doc.part.get_or_add_image(io.BytesIO(rel.target_part.blob))
+                    else:
+                        rid_map[rid] = None
+                if rid_map[rid] is None:
+                    del node.attrib[attr]
+                else:
+                    node.set(attr, rid_map[rid])
+
+    def _blank_header_footer(self, sectPr):
+        """Static pages carry their own header/footer; point them at empty parts"""
+        for child in list(sectPr):
+            if child.tag in (qn('w:headerReference'), qn('w:footerReference'), qn('w:titlePg')):
+                sectPr.remove(child)
+        if self._empty_header is None:
+            _, header_rid = self.doc.part.add_header_part()
+            _, footer_rid = self.doc.part.add_footer_part()
+            self._empty_header = (header_rid, footer_rid)
+        sectPr.add_headerReference(WD_HEADER_FOOTER.PRIMARY, self._empty_header[0])
+        sectPr.add_footerReference(WD_HEADER_FOOTER.PRIMARY, self._empty_header[1])
+
+    def finish(self):
+        """Let the last static page's section close the document instead of a blank one"""
+        body = self.doc.element.body
+        last = body.sectPr.getprevious()
+        if last is not None and last.tag == qn('w:p') and last.pPr is not None and last.pPr.sectPr is not None:
+            body.replace(body.sectPr, last.pPr.sectPr)
+            body.remove(last)
+
+
+def render_proposal_docx(elements, cover_type, header_path, static_pdfs):
+    """Lay out the proposal flowables as a Word document; return the .docx bytes.
+
+    static_pdfs are the two static PDF inserts (pages 2-4 and 14-21) whose
+    pre-built fragments go after the cover and after the dynamic pages.
+    """
+    static_before, static_after = static_pdfs
+    cover_end = next(i for i, flowable in enumerate(elements) if isinstance(flowable, PageBreak))
+
+    doc = Document()
+    writer = DocxProposalWriter(doc, cover_type, header_path)
+    section = doc.sections[0]
+    section.page_width, section.page_height = Pt(letter[0]), Pt(letter[1])
+    section.left_margin = section.right_margin = Inches(0.5)
+    section.top_margin = section.bottom_margin = Inches(0.5)
+    writer.add(elements[:cover_end])
+
+    fragment = docx_fragment_cache.get(static_before)
+    if fragment is not None:
+        writer.append_fragment(fragment)
+    else:
+        log.warning("⚠️  WARNING: no Word fragment for %s", static_before)
+
+    if fragment is None:
+        doc.add_section(WD_SECTION.NEW_PAGE)
+    writer.start_dynamic_section()
+    writer.add(elements[cover_end + 1:])
+
+    fragment = docx_fragment_cache.get(static_after)
+    if fragment is not None:
+        writer.append_fragment(fragment)
+        writer.finish()
+    else:
+        log.warning("⚠️  WARNING: no Word fragment for %s", static_after)
+
+    output = io.BytesIO()
+    doc.save(output)
+    log.info("✅ Word created")
+    return output.getvalue()
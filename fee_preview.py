@@ -0,0 +1,132 @@
+"""Live preview of the fee tables, built from the ProposalModel alone.
+
+The form calls POST /preview while staff edit it, so this must stay cheap:
+no ReportLab layout and no PDF merge. Labels and notes in the catalog use
+ReportLab's paragraph markup; markup_html() maps it to the equivalent HTML
+and, like ReportLab, drops tags it does not know.
+"""
+import html
+import re
+
+from proposal_model import proposal_totals
+
+_TAG = re.compile(r'<(/?)([A-Za-z]+)([^<>]*)>')
+# The catalog has attributes without a space between them (color="#C00000"face="...")
+_ATTRIBUTE = re.compile(r'([A-Za-z]+)\s*=\s*"([^"]*)"')
+_COLOR = re.compile(r'#[0-9A-Fa-f]{3,8}|[A-Za-z]+')
+_SIMPLE_TAGS = ('b', 'i', 'u')
+
+
+def _font_span(attributes):
+    attributes = {name.lower(): value for name, value in _ATTRIBUTE.findall(attributes)}
+    style = []
+    if _COLOR.fullmatch(attributes.get('color', '')):
+        style.append(f'color:{attributes["color"]}')
+    if 'bold' in attributes.get('face', '').lower():
+        style.append('font-weight:bold')
+    return f'<span style="{";".join(style)}">' if style else '<span>'
+
+
+def markup_html(text):
+    """ReportLab paragraph markup as an HTML fragment"""
+    out = []
+    pos = 0
+    for match in _TAG.finditer(text):
+        out.append(html.escape(text[pos:match.start()], quote=False))
+        pos = match.end()
+        closing, tag, attributes = match.groups()
+        tag = tag.lower()
+        if tag == 'br':
+            out.append('<br>')
+        elif tag in _SIMPLE_TAGS:
+            out.append(f'</{tag}>' if closing else f'<{tag}>')
+        elif tag == 'font':
+            out.append('</span>' if closing else _font_span(attributes))
+    out.append(html.escape(text[pos:], quote=False))
+    return ''.join(out)
+
+
+def markup_text(text):
+    """ReportLab paragraph markup as plain text on one line"""
+    return ' '.join(_TAG.sub(' ', text).split())
+
+
+def _cell(content, tag='td', css=None, span=None):
+    attributes = f' class="{css}"' if css else ''
+    if span and span[1] > 1:
+        attributes += f' {span[0]}="{span[1]}"'
+    return f'<{tag}{attributes}>{content}</{tag}>'
+
+
+def _tier_html(tiers, rows):
+    headers = ''.join(_cell(html.escape(header), 'th') for header in tiers.headers)
+    body = ''.join('<tr>' + ''.join(_cell(html.escape(str(value))) for value in row) + '</tr>' for row in rows)
+    return f'<table class="tier-table"><tr>{headers}</tr>{body}</table>'
+
+
+def fee_table_html(fee_table):
+    """HTML table of one FeeTable, laid out like app.fee_table()"""
+    section = fee_table.section
+    kinds = [kind for _, kind in section.columns]
+    rows = ['<tr>' + ''.join(_cell(html.escape(header), 'th') for header, _ in section.columns) + '</tr>']
+    for fee_group in fee_table.groups:
+        group = fee_group.group
+        for i, line in enumerate(fee_group.lines):
+            cells = []
+            for kind in kinds:
+                if kind == 'label':
+                    if group.label is None:
+                        cells.append(_cell(markup_html(line.service.label)))
+                    elif i == 0:
+                        cells.append(_cell(markup_html(group.label), span=('rowspan', len(fee_group.lines))))
+                elif kind == 'frequency':
+                    cells.append(_cell(html.escape(line.frequency or ''), css='frequency'))
+                elif kind == 'notes':
+                    notes = markup_html(line.service.notes)
+                    if line.tiers is not None:
+                        notes += _tier_html(line.service.tiers, line.tiers)
+                    cells.append(_cell(notes))
+                else:
+                    cells.append(_cell(html.escape(line.display_fee), css='fee'))
+            rows.append('<tr>' + ''.join(cells) + '</tr>')
+    for label, value in fee_table.totals:
+        rows.append('<tr class="total">' + _cell(f'<b>{html.escape(label)}</b>', span=('colspan', len(kinds) - 1))
+                    + _cell(html.escape(value), css='fee') + '</tr>')
+    return f'<table class="fee-table" data-section="{section.key}">{"".join(rows)}</table>'
+
+
+def fee_table_preview(fee_table):
+    """JSON-ready rows, totals and HTML of one FeeTable"""
+    rows = []
+    for fee_group in fee_table.groups:
+        for line in fee_group.lines:
+            rows.append({
+                'service': line.service.fee_key,
+                'label': markup_text(line.service.label or fee_group.group.label or ''),
+                'frequency': line.frequency,
+                'fee': line.fee,
+                'display_fee': line.display_fee,
+                'tiers': [list(row) for row in line.tiers] if line.tiers is not None else None,
+            })
+    preview = {
+        'section': fee_table.section.key,
+        'columns': [header for header, _ in fee_table.section.columns],
+        'rows': rows,
+        'totals': [{'label': label, 'value': value} for label, value in fee_table.totals],
+        'total_annual_cost': None,
+        'total_onetime_cost': None,
+        'html': fee_table_html(fee_table),
+    }
+    if fee_table.amounts is not None:
+        preview.update(fee_table.amounts.as_dict())
+    return preview
+
+
+def proposal_preview(proposal):
+    """Fee tables of a ProposalModel that the PDF would show, with their totals summed"""
+    tables = [fee_table_preview(table) for table in proposal.fees.values() if table.groups or table.totals]
+    return {
+        'sections': tables,
+        **proposal_totals(proposal).as_dict(),
+        'html': '\n'.join(table['html'] for table in tables),
+    }
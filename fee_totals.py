@@ -0,0 +1,146 @@
+"""Fee totals in integer cents.
+
+Fees are parsed once from the form (to_cents) and frequencies are
+normalized once to a Frequency (parse_frequency). total_fees_batch() then
+sums any number of proposals in a single pass over their
+(proposal, frequency, cents) lines, with integer arithmetic only: the
+per-frequency subtotals are accumulated and the one-time and per annum
+totals are derived from them at the end.
+"""
+import enum
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+
+
+class Frequency(enum.Enum):
+    """Billing frequency of a fee line"""
+    ONE_TIME = 'one_time'
+    MONTHLY = 'monthly'
+    QUARTERLY = 'quarterly'
+    ANNUAL = 'annual'
+    OTHER = 'other'      # counted in neither total
+
+
+PER_ANNUM = {Frequency.MONTHLY: 12, Frequency.QUARTERLY: 4, Frequency.ANNUAL: 1}
+# Whole-unit digits of the largest fee accepted; anything bigger is a typo, not a price
+MAX_DIGITS = 15
+MAX_CENTS = 10 ** (MAX_DIGITS + 2) - 1
+
+# Options of the form's frequency selects
+FORM_FREQUENCIES = {
+    'one time': Frequency.ONE_TIME,
+    'one-time': Frequency.ONE_TIME,
+    'monthly': Frequency.MONTHLY,
+    'monthly/quarterly': Frequency.MONTHLY,
+    'monthly and annual': Frequency.MONTHLY,
+    'quarterly': Frequency.QUARTERLY,
+    'annual': Frequency.ANNUAL,
+}
+# Other text is matched by the first of these words it contains
+FREQUENCY_WORDS = (
+    ('one time', Frequency.ONE_TIME),
+    ('one-time', Frequency.ONE_TIME),
+    ('monthly', Frequency.MONTHLY),
+    ('quarterly', Frequency.QUARTERLY),
+    ('annual', Frequency.ANNUAL),
+)
+
+
+@lru_cache(maxsize=256)
+def _parse_frequency_text(text):
+    text = ' '.join(text.lower().split())
+    frequency = FORM_FREQUENCIES.get(text)
+    if frequency is not None:
+        return frequency
+    for word, frequency in FREQUENCY_WORDS:
+        if word in text:
+            return frequency
+    return Frequency.OTHER
+
+
+def parse_frequency(value):
+    """Frequency of a form value ('Monthly', 'One-time', ...); Frequency.OTHER if it names none"""
+    if isinstance(value, Frequency):
+        return value
+    if not isinstance(value, str):
+        return Frequency.OTHER
+    return _parse_frequency_text(value)
+
+
+def _checked_cents(cents, value):
+    if abs(cents) > MAX_CENTS:
+        raise ValueError(f'Amount too large: {value!r}')
+    return cents
+
+
+def to_cents(value):
+    """Integer cents of a fee sent as a number or text ('1500', '1,500.50'); None if blank.
+
+    Raises ValueError for anything that is not a finite amount of at most
+    MAX_DIGITS whole digits.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return _checked_cents(value * 100, value)
+    text = str(value).strip().replace(',', '')
+    if not text:
+        return None
+    if text.isascii() and text.isdigit() and len(text) <= MAX_DIGITS:
+        return int(text) * 100
+    try:
+        amount = Decimal(text)
+        if not amount.is_finite() or amount.adjusted() >= MAX_DIGITS:
+            raise ValueError(f'Not an amount: {value!r}')
+        cents = int(amount.scaleb(2).to_integral_value(ROUND_HALF_UP))
+    except ArithmeticError:
+        raise ValueError(f'Not an amount: {value!r}') from None
+    return _checked_cents(cents, value)
+
+
+def format_cents(cents):
+    """Amount with thousands separators, without a currency sign; cents only when there are any"""
+    sign = '-' if cents < 0 else ''
+    units, cents = divmod(abs(cents), 100)
+    return f'{sign}{units:,}' + (f'.{cents:02d}' if cents else '')
+
+
+def cents_value(cents):
+    """Amount as a JSON number: an int for whole amounts"""
+    return cents // 100 if cents % 100 == 0 else cents / 100
+
+
+class FeeTotals:
+    """Subtotals per Frequency of a set of fee lines, in cents"""
+    __slots__ = ('by_frequency',)
+
+    def __init__(self, by_frequency=None):
+        self.by_frequency = by_frequency if by_frequency is not None else dict.fromkeys(Frequency, 0)
+
+    @property
+    def one_time(self):
+        return self.by_frequency[Frequency.ONE_TIME]
+
+    @property
+    def annual(self):
+        return sum(self.by_frequency[frequency] * factor for frequency, factor in PER_ANNUM.items())
+
+    def as_dict(self):
+        return {
+            'total_annual_cost': cents_value(self.annual),
+            'total_onetime_cost': cents_value(self.one_time),
+            'subtotals': {frequency.value: cents_value(cents) for frequency, cents in self.by_frequency.items()},
+        }
+
+
+def total_fees_batch(lines, count):
+    """FeeTotals of `count` proposals from (proposal index, Frequency, cents) lines, in one pass"""
+    subtotals = [dict.fromkeys(Frequency, 0) for _ in range(count)]
+    for index, frequency, cents in lines:
+        subtotals[index][frequency] += cents
+    return [FeeTotals(by_frequency) for by_frequency in subtotals]
+
+
+def total_fees(lines):
+    """FeeTotals of (Frequency, cents) lines"""
+    return total_fees_batch(((0, frequency, cents) for frequency, cents in lines), 1)[0]
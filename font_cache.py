@@ -0,0 +1,137 @@
+"""TrueType fonts that load from a pickle cache and reuse their embedded subsets.
+
+ReportLab parses every .ttf at startup and builds a fresh glyph subset for
+every document. CachedTTFont loads the parsed face from a pickle written on
+first use, gives the non-ASCII glyphs of the templates fixed codes in every
+document, and keeps the subsets it has built. Ordinary proposals therefore
+all embed the same subset, which is built once and stored with the pickle.
+"""
+import hashlib
+import os
+import pickle
+import threading
+import uuid
+from weakref import WeakKeyDictionary
+
+import reportlab
+from reportlab import rl_config
+from reportlab.pdfbase.ttfonts import TTEncoding, TTFont, TTFontFace
+
+from telemetry import log
+
+# Non-ASCII glyphs the proposal templates use; ASCII is always in subset 0
+TEMPLATE_GLYPHS = '•–’'
+SUBSET_CACHE_MAX = 64
+
+
+class SubsetCachingFace(TTFontFace):
+    """TTFontFace that keeps the font subsets it has built, keyed by glyph list"""
+
+    def __init__(self, filename):
+        TTFontFace.__init__(self, filename)
+        self._subsets = {}
+        self._subsets_lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_subsets_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._subsets_lock = threading.Lock()
+
+    def makeSubset(self, subset):
+        key = tuple(subset)
+        data = self._subsets.get(key)
+        if data is None:
+            # makeSubset seeks through the shared font data, so build one at a time
+            with self._subsets_lock:
+                data = self._subsets.get(key)
+                if data is None:
+                    data = TTFontFace.makeSubset(self, subset)
+                    if len(self._subsets) >= SUBSET_CACHE_MAX:
+                        self._subsets.clear()
+                    self._subsets[key] = data
+        return data
+
+
+class _SubsetProbe:
+    """Stand-in document for computing a subset layout (font state is keyed by document)"""
+
+
+class CachedTTFont(TTFont):
+    """TTFont with a pickled face and template glyphs assigned up front in each document"""
+
+    def __init__(self, name, filename, cache_dir=None, preset=TEMPLATE_GLYPHS):
+        # Same attributes TTFont.__init__ sets, without parsing the file again
+        self.fontName = name
+        self.encoding = TTEncoding()
+        self.state = WeakKeyDictionary()
+        self._asciiReadable = rl_config.ttfAsciiReadable
+        self.preset = preset
+
+        cache_path = face_cache_path(cache_dir, filename) if cache_dir else None
+        self.face = _read_face(cache_path) if cache_path else None
+        if self.face is None:
+            self.face = SubsetCachingFace(filename)
+            # Build the subset of a template-only document so it is stored with the face
+            self.face.makeSubset(self.template_subset())
+            if cache_path:
+                _write_face(cache_path, self.face)
+
+    def splitString(self, text, doc, encoding='utf-8'):
+        if self.preset and doc not in self.state:
+            TTFont.splitString(self, self.preset, doc, encoding)
+        return TTFont.splitString(self, text, doc, encoding)
+
+    def template_subset(self):
+        """Glyph list of subset 0 in a document using only ASCII and the preset glyphs"""
+        probe = _SubsetProbe()
+        self.splitString('', probe)
+        return list(self.state.pop(probe).subsets[0])
+
+    def template_encode(self, text):
+        """text encoded as in any document, or None if it needs glyphs outside the template subset"""
+        probe = _SubsetProbe()
+        self.splitString('', probe)
+        template_size = len(self.state[probe].subsets[0])
+        chunks = self.splitString(text, probe)
+        subsets = self.state.pop(probe).subsets
+        if len(subsets) > 1 or len(subsets[0]) != template_size:
+            return None
+        return b''.join(data for _, data in chunks)
+
+
+def face_cache_path(cache_dir, filename):
+    """Pickle file for a font, keyed by the font file version and ReportLab version"""
+    st = os.stat(filename)
+    key = f'{os.path.abspath(filename)}:{st.st_size}:{st.st_mtime_ns}:{reportlab.Version}'
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(filename))[0]
+    return os.path.join(cache_dir, f'{name}-{digest}.pickle')
+
+
+def _read_face(path):
+    try:
+        with open(path, 'rb') as f:
+            face = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log.warning("⚠️ Font cache %s unreadable: %s", path, e)
+        return None
+    return face if isinstance(face, SubsetCachingFace) else None
+
+
+def _write_face(path, face):
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(face, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        log.warning("⚠️ Could not write font cache %s: %s", path, e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
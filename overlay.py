@@ -0,0 +1,253 @@
+"""Overlay stamping: fill designer-made template PDFs instead of laying pages out.
+
+A template is an ordinary PDF whose variable text is marked with AcroForm
+text fields. The field name says which value goes there, its rectangle is
+the box, and its default appearance (/DA) gives the font, size (0 = fit
+the box) and colour; /Q aligns the text left, centred or right.
+
+prepare_template() strips the fields and gives each page that had any an
+empty form XObject drawn over the artwork. Per request only that form's
+content changes (a few text operators from fill()), and the page itself
+is reused as it is, the same way the splice restamps page labels.
+"""
+import io
+import re
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    FloatObject,
+    NameObject,
+)
+from reportlab.lib.rl_accel import escapePDF, fp_str
+from reportlab.pdfbase import pdfmetrics
+
+OVERLAY_FORM = '/OverlayFields'
+PADDING = 2
+AUTO_SIZE_MAX = 12
+LEADING = 1.15
+MULTILINE_FLAG = 1 << 12
+
+# Base 14 fonts by BaseFont name, and the resource names Acrobat gives them in /DR
+STANDARD_FONTS = {
+    'Helvetica', 'Helvetica-Bold', 'Helvetica-Oblique', 'Helvetica-BoldOblique',
+    'Times-Roman', 'Times-Bold', 'Times-Italic', 'Times-BoldItalic',
+    'Courier', 'Courier-Bold', 'Courier-Oblique', 'Courier-BoldOblique',
+}
+FONT_ALIASES = {
+    '/Helv': 'Helvetica', '/HeBo': 'Helvetica-Bold', '/HeOb': 'Helvetica-Oblique', '/HeBO': 'Helvetica-BoldOblique',
+    '/TiRo': 'Times-Roman', '/TiBo': 'Times-Bold', '/TiIt': 'Times-Italic', '/TiBI': 'Times-BoldItalic',
+    '/Cour': 'Courier', '/CoBo': 'Courier-Bold', '/CoOb': 'Courier-Oblique', '/CoBO': 'Courier-BoldOblique',
+}
+DEFAULT_APPEARANCE = '/Helv 0 Tf 0 g'
+_INHERITED = ('/Resources', '/MediaBox', '/CropBox', '/Rotate')
+_COLOR_OPERATORS = {'g': 1, 'rg': 3, 'k': 4}
+
+
+class Anchor:
+    """A named text box on a template page"""
+    __slots__ = ('name', 'rect', 'font', 'size', 'color', 'align', 'multiline')
+
+    def __init__(self, name, rect, font, size, color, align, multiline):
+        self.name = name
+        self.rect = rect
+        self.font = font
+        self.size = size
+        self.color = color
+        self.align = align
+        self.multiline = multiline
+
+
+class OverlayTemplate:
+    """A prepared template: its PDF bytes and the anchors of each page (page index -> [Anchor])"""
+
+    def __init__(self, pdf, anchors):
+        self.pdf = pdf
+        self.anchors = anchors
+
+    @property
+    def field_names(self):
+        return {anchor.name for anchors in self.anchors.values() for anchor in anchors}
+
+
+def _field_attribute(field, key):
+    while field is not None:
+        if key in field:
+            return field[key]
+        field = field.get('/Parent')
+        field = field.get_object() if field is not None else None
+    return None
+
+
+def _field_name(field):
+    parts = []
+    while field is not None:
+        if '/T' in field:
+            parts.append(str(field['/T']))
+        field = field.get('/Parent')
+        field = field.get_object() if field is not None else None
+    return '.'.join(reversed(parts))
+
+
+def _inherited(page, key):
+    node = page.get('/Parent')
+    while node is not None:
+        node = node.get_object()
+        if key in node:
+            return node[key]
+        node = node.get('/Parent')
+    return None
+
+
+def _parse_appearance(appearance, fonts):
+    """(font, size, colour operator) of a /DA string"""
+    tokens = appearance.split()
+    font, size, color = 'Helvetica', 0.0, '0 g'
+    for i, token in enumerate(tokens):
+        if token == 'Tf' and i >= 2:
+            alias = tokens[i - 2]
+            base_font = fonts.get(alias)
+            font = base_font if base_font in STANDARD_FONTS else FONT_ALIASES.get(alias, 'Helvetica')
+            size = float(tokens[i - 1])
+        elif token in _COLOR_OPERATORS and i >= _COLOR_OPERATORS[token]:
+            color = ' '.join(tokens[i - _COLOR_OPERATORS[token]:i + 1])
+    return font, size, color
+
+
+def _font_dict(font):
+    return DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/' + font),
+        NameObject('/Encoding'): NameObject('/WinAnsiEncoding'),
+    })
+
+
+def _font_resource(font):
+    return '/' + re.sub(r'[^A-Za-z0-9]', '', font)
+
+
+def _stream(writer, data, **entries):
+    stream = DecodedStreamObject()
+    for key, value in entries.items():
+        stream[NameObject('/' + key)] = value
+    stream.set_data(data)
+    return writer._add_object(stream)
+
+
+def prepare_template(data):
+    """Turn a template PDF with text fields into an OverlayTemplate"""
+    writer = PdfWriter(clone_from=PdfReader(io.BytesIO(data)))
+    acro_form = writer._root_object.get('/AcroForm')
+    acro_form = acro_form.get_object() if acro_form is not None else DictionaryObject()
+    default_appearance = str(acro_form.get('/DA', DEFAULT_APPEARANCE))
+    resource_fonts = acro_form.get('/DR', DictionaryObject()).get_object().get('/Font', DictionaryObject()).get_object()
+    fonts = {str(alias): str(font.get_object().get('/BaseFont', ''))[1:] for alias, font in resource_fonts.items()}
+
+    anchors = {}
+    wrap_start = wrap_end = None
+    for index, page in enumerate(writer.pages):
+        page_anchors = []
+        kept = ArrayObject()
+        for annot_ref in page.get('/Annots', ()):
+            annot = annot_ref.get_object()
+            if annot.get('/Subtype') != '/Widget' or _field_attribute(annot, '/FT') != '/Tx':
+                kept.append(annot_ref)
+                continue
+            font, size, color = _parse_appearance(str(_field_attribute(annot, '/DA') or default_appearance), fonts)
+            x1, y1, x2, y2 = (float(value) for value in annot['/Rect'])
+            page_anchors.append(Anchor(
+                _field_name(annot),
+                (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)),
+                font, size, color,
+                int(_field_attribute(annot, '/Q') or acro_form.get('/Q', 0)),
+                bool(int(_field_attribute(annot, '/Ff') or 0) & MULTILINE_FLAG),
+            ))
+        if not page_anchors:
+            continue
+        anchors[index] = page_anchors
+        if kept:
+            page[NameObject('/Annots')] = kept
+        else:
+            del page['/Annots']
+
+        # The splice gives pages a new parent, so inherited attributes must live on the page
+        for key in _INHERITED:
+            if key not in page:
+                value = _inherited(page, key)
+                if value is not None:
+                    page[NameObject(key)] = value
+        resources = page.get('/Resources')
+        resources = DictionaryObject() if resources is None else DictionaryObject(resources.get_object())
+        xobjects = resources.get('/XObject')
+        xobjects = DictionaryObject() if xobjects is None else DictionaryObject(xobjects.get_object())
+
+        used_fonts = sorted({anchor.font for anchor in page_anchors})
+        form_fonts = DictionaryObject({NameObject(_font_resource(font)): _font_dict(font) for font in used_fonts})
+        xobjects[NameObject(OVERLAY_FORM)] = _stream(
+            writer, b'',
+            Type=NameObject('/XObject'), Subtype=NameObject('/Form'),
+            BBox=ArrayObject(FloatObject(value) for value in page.mediabox),
+            Resources=DictionaryObject({NameObject('/Font'): form_fonts}))
+        resources[NameObject('/XObject')] = xobjects
+        page[NameObject('/Resources')] = resources
+
+        # Keep the artwork's graphics state from leaking into the overlay
+        if wrap_start is None:
+            wrap_start = _stream(writer, b'q\n')
+            wrap_end = _stream(writer, b'\nQ\nq ' + OVERLAY_FORM.encode('ascii') + b' Do Q\n')
+        contents = page.get('/Contents')
+        contents = contents.get_object() if contents is not None else ArrayObject()
+        if not isinstance(contents, ArrayObject):
+            contents = ArrayObject([page.raw_get('/Contents')])
+        page[NameObject('/Contents')] = ArrayObject([wrap_start, *contents, wrap_end])
+
+    if '/AcroForm' in writer._root_object:
+        del writer._root_object['/AcroForm']
+    out = io.BytesIO()
+    writer.write(out)
+    return OverlayTemplate(out.getvalue(), anchors)
+
+
+def _fit_size(anchor, lines):
+    width = anchor.rect[2] - anchor.rect[0] - 2 * PADDING
+    height = anchor.rect[3] - anchor.rect[1] - 2 * PADDING
+    size = anchor.size or min(AUTO_SIZE_MAX, height / (len(lines) * LEADING))
+    widest = max((pdfmetrics.stringWidth(line, anchor.font, size) for line in lines), default=0)
+    if widest > width > 0:
+        # Shrink to fit rather than run out of the box
+        size *= width / widest
+    return size
+
+
+def _text(anchor, value):
+    lines = str(value).splitlines() if anchor.multiline else [' '.join(str(value).split())]
+    lines = lines or ['']
+    size = _fit_size(anchor, lines)
+    x1, y1, x2, y2 = anchor.rect
+    ascent, descent = pdfmetrics.getAscentDescent(anchor.font, size)
+    if anchor.multiline:
+        baseline = y2 - PADDING - ascent
+    else:
+        baseline = y1 + (y2 - y1 - (ascent - descent)) / 2 - descent
+    ops = ['q', anchor.color, 'BT %s %s Tf' % (_font_resource(anchor.font), fp_str(size))]
+    for line in lines:
+        width = pdfmetrics.stringWidth(line, anchor.font, size)
+        if anchor.align == 1:
+            x = (x1 + x2 - width) / 2
+        elif anchor.align == 2:
+            x = x2 - PADDING - width
+        else:
+            x = x1 + PADDING
+        ops.append('1 0 0 1 %s Tm (%s) Tj' % (fp_str(x, baseline), escapePDF(line.encode('cp1252', 'replace'))))
+        baseline -= size * LEADING
+    ops.append('ET Q')
+    return '\n'.join(ops)
+
+
+def fill(anchors, values):
+    """Content of a page's overlay form: each anchor's value from values (missing ones stay blank)"""
+    return '\n'.join(_text(anchor, values[anchor.name]) for anchor in anchors
+                     if values.get(anchor.name) not in (None, '')).encode('latin-1')
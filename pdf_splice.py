@@ -0,0 +1,318 @@
+"""Byte-level PDF splicing for the proposal merge.
+
+The static inserts never change between requests, so their page object
+graphs are serialized once into a single byte block with fixed object
+numbers. Per request only the small ReportLab document is renumbered and
+written; the final file is the header, the pre-built static block, the
+dynamic objects, a fresh page tree and a freshly computed xref table.
+
+Dynamic pages may come from several documents (one per page group);
+streams that are byte-identical across them, such as embedded font subsets
+and the header image, are written once.
+
+Every page gets the new page tree as its parent, so page attributes it
+inherited from its old page tree (resources, boxes, rotation) are written
+onto the page itself. The outline and name dictionary of the catalog are
+taken from the first static insert that has them.
+
+Object numbering of a spliced file:
+    1                       catalog
+    2                       page tree root (parent of every page)
+    3 .. 3+S-1              static objects (pre-serialized)
+    3+S ..                  dynamic objects (renumbered per request)
+"""
+import io
+
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    StreamObject,
+)
+
+PDF_HEADER = b'%PDF-1.7\n%\xe2\xe3\xcf\xd3\n'
+CATALOG_NUM = 1
+PAGES_NUM = 2
+FIRST_OBJECT_NUM = 3
+
+_PARENT = NameObject('/Parent')
+_LENGTH = NameObject('/Length')
+_TYPE = NameObject('/Type')
+_FILTER = NameObject('/Filter')
+_DECODE_PARMS = NameObject('/DecodeParms')
+_INHERITED = tuple(NameObject(key) for key in ('/Resources', '/MediaBox', '/CropBox', '/Rotate'))
+_CATALOG_EXTRAS = tuple(NameObject(key) for key in ('/Outlines', '/Names'))
+
+# Kinds of PDF object the splice walks. pypdf objects are typing.Protocol
+# subclasses, which makes isinstance() slow, so the kind is cached per class.
+_REF, _STREAM, _DICT, _ARRAY, _OTHER = range(5)
+_KINDS = {}
+
+
+def _kind(obj):
+    cls = type(obj)
+    kind = _KINDS.get(cls)
+    if kind is None:
+        if issubclass(cls, IndirectObject):
+            kind = _REF
+        elif issubclass(cls, StreamObject):
+            kind = _STREAM
+        elif issubclass(cls, DictionaryObject):
+            kind = _DICT
+        elif issubclass(cls, ArrayObject):
+            kind = _ARRAY
+        else:
+            kind = _OTHER
+        _KINDS[cls] = kind
+    return kind
+
+
+class _ObjectGraph:
+    """Objects reachable from a set of pages, renumbered from a base number"""
+
+    def __init__(self, first_num, replacements=()):
+        self.next_num = first_num
+        self.numbers = {}
+        self.order = []
+        self.streams = {}
+        self.inherited = {}  # new page number -> attributes the page inherited from its old page tree
+        self.replacements = {_key(ref): obj for ref, obj in replacements}
+
+    def add_pages(self, pages):
+        """Collect every page and its resources; return the pages' new numbers"""
+        page_nums = []
+        for page in pages:
+            ref = page.indirect_reference
+            self._collect(ref)
+            page_nums.append(self.numbers[_key(ref)])
+        return page_nums
+
+    def add(self, obj):
+        """Collect an object that is not reached from the pages, such as a catalog entry"""
+        self._collect(obj)
+
+    def _collect(self, obj):
+        stack = [obj]
+        while stack:
+            obj = stack.pop()
+            kind = _kind(obj)
+            if kind == _REF:
+                key = _key(obj)
+                if key in self.numbers:
+                    continue
+                target = self.replacements.get(key)
+                if target is None:
+                    target = obj.get_object()
+                if _is_page_tree(target):
+                    # References back into the source page tree point at the new root
+                    self.numbers[key] = PAGES_NUM
+                    continue
+                stream_key = _stream_key(target)
+                if stream_key is not None:
+                    if stream_key in self.streams:
+                        self.numbers[key] = self.streams[stream_key]
+                        continue
+                    self.streams[stream_key] = self.next_num
+                self.numbers[key] = self.next_num
+                self.order.append((self.next_num, target))
+                if _is_page(target):
+                    inherited = _inherited_attributes(target)
+                    if inherited:
+                        self.inherited[self.next_num] = inherited
+                        stack.extend(inherited.values())
+                self.next_num += 1
+                stack.append(target)
+            elif kind == _DICT or kind == _STREAM:
+                is_stream = kind == _STREAM
+                for key, value in obj.items():
+                    if key == _PARENT and _is_page(obj):
+                        continue
+                    if key == _LENGTH and is_stream:
+                        continue
+                    stack.append(value)
+            elif kind == _ARRAY:
+                stack.extend(obj)
+
+    def serialize(self, base_offset):
+        """Write every collected object; return (bytes, absolute offsets)"""
+        out = io.BytesIO()
+        offsets = []
+        for num, obj in self.order:
+            offsets.append(base_offset + out.tell())
+            out.write(b'%d 0 obj\n' % num)
+            _write_object(out, obj, self.numbers, top_level=True, inherited=self.inherited.get(num))
+            out.write(b'\nendobj\n')
+        return out.getvalue(), offsets
+
+
+def _key(ref):
+    # Object numbers are only unique within one source document
+    return id(ref.pdf), ref.idnum, ref.generation
+
+
+def _stream_key(obj):
+    """Identity of a self-contained stream (no indirect references), else None"""
+    if _kind(obj) != _STREAM:
+        return None
+    out = io.BytesIO()
+    for key, value in obj.items():
+        if key == _LENGTH:
+            continue
+        if _has_reference(value):
+            return None
+        key.write_to_stream(out)
+        value.write_to_stream(out)
+    return out.getvalue(), obj._data
+
+
+def _has_reference(obj):
+    kind = _kind(obj)
+    if kind == _REF:
+        return True
+    if kind == _DICT or kind == _STREAM:
+        return any(_has_reference(value) for value in obj.values())
+    if kind == _ARRAY:
+        return any(_has_reference(value) for value in obj)
+    return False
+
+
+def replace_stream(stream, data):
+    """A copy of a parsed stream's dictionary holding new, unfiltered data"""
+    copy = DecodedStreamObject()
+    for key, value in stream.items():
+        if key not in (_FILTER, _DECODE_PARMS, _LENGTH):
+            copy[key] = value
+    copy.set_data(data)
+    return copy
+
+
+def _inherited_attributes(page):
+    """Attributes a page takes from its page tree ancestors, as {key: raw value}"""
+    attributes = {}
+    node = page.get(_PARENT)
+    while node is not None:
+        node = node.get_object()
+        for key in _INHERITED:
+            if key in node and key not in page and key not in attributes:
+                attributes[key] = node.raw_get(key)
+        node = node.get(_PARENT)
+    return attributes
+
+
+def _is_page(obj):
+    return _kind(obj) in (_DICT, _STREAM) and obj.get(_TYPE) == '/Page'
+
+
+def _is_page_tree(obj):
+    return _kind(obj) in (_DICT, _STREAM) and obj.get(_TYPE) == '/Pages'
+
+
+def _write_object(out, obj, numbers, top_level=False, inherited=None):
+    kind = _kind(obj)
+    if kind == _REF:
+        out.write(b'%d 0 R' % numbers[_key(obj)])
+    elif kind == _DICT or kind == _STREAM:
+        is_stream = kind == _STREAM
+        is_page = top_level and _is_page(obj)
+        out.write(b'<<')
+        for key, value in obj.items():
+            if (is_page and key == _PARENT) or (is_stream and key == _LENGTH):
+                continue
+            key.write_to_stream(out)
+            out.write(b' ')
+            _write_object(out, value, numbers)
+            out.write(b'\n')
+        if is_page:
+            for key, value in (inherited or {}).items():
+                key.write_to_stream(out)
+                out.write(b' ')
+                _write_object(out, value, numbers)
+                out.write(b'\n')
+            out.write(b'/Parent %d 0 R\n' % PAGES_NUM)
+        if is_stream:
+            data = obj._data
+            out.write(b'/Length %d\n>>\nstream\n' % len(data))
+            out.write(data)
+            out.write(b'\nendstream')
+        else:
+            out.write(b'>>')
+    elif kind == _ARRAY:
+        out.write(b'[')
+        for i, value in enumerate(obj):
+            if i:
+                out.write(b' ')
+            _write_object(out, value, numbers)
+        out.write(b']')
+    else:
+        obj.write_to_stream(out)
+
+
+class SpliceTemplate:
+    """Pre-serialized static inserts that dynamic pages are spliced around.
+
+    static_readers are fully parsed PdfReader objects; they are serialized
+    once here and the readers are not touched again by render().
+    """
+
+    def __init__(self, static_readers):
+        graph = _ObjectGraph(FIRST_OBJECT_NUM)
+        self.static_pages = [graph.add_pages(reader.pages) for reader in static_readers]
+        catalog_extras = {}
+        for reader in static_readers:
+            catalog = reader.trailer['/Root']
+            for key in _CATALOG_EXTRAS:
+                if key in catalog and key not in catalog_extras:
+                    catalog_extras[key] = catalog.raw_get(key)
+                    graph.add(catalog_extras[key])
+        self.block, offsets = graph.serialize(len(PDF_HEADER))
+        out = io.BytesIO()
+        for key, value in catalog_extras.items():
+            key.write_to_stream(out)
+            out.write(b' ')
+            _write_object(out, value, graph.numbers)
+            out.write(b'\n')
+        self._catalog_extras = out.getvalue()
+        self.next_num = graph.next_num
+        self._xref_entries = b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+
+    def render(self, dynamic_pages, layout, replacements=()):
+        """Splice dynamic_pages (pypdf pages, from one or more readers) around the static block.
+
+        layout lists the page order of the final document: ('static', i)
+        inserts every page of the i-th static reader, ('dynamic', start, stop)
+        inserts that slice of the dynamic pages. replacements are (indirect
+        reference, object) pairs written in place of the referenced objects,
+        so shared readers need not be modified. Returns the output as a list
+        of byte chunks; most of its size is the shared static block.
+        """
+        graph = _ObjectGraph(self.next_num, replacements)
+        kids = []
+        for item in layout:
+            if item[0] == 'static':
+                kids.extend(self.static_pages[item[1]])
+            else:
+                kids.extend(graph.add_pages(dynamic_pages[item[1]:item[2]]))
+
+        dynamic_offset = len(PDF_HEADER) + len(self.block)
+        dynamic_block, dynamic_offsets = graph.serialize(dynamic_offset)
+
+        tree_offset = dynamic_offset + len(dynamic_block)
+        page_tree = b'%d 0 obj\n<</Type /Pages\n/Kids [%s]\n/Count %d\n>>\nendobj\n' % (
+            PAGES_NUM, b' '.join(b'%d 0 R' % num for num in kids), len(kids))
+        catalog_offset = tree_offset + len(page_tree)
+        catalog = b'%d 0 obj\n<</Type /Catalog\n/Pages %d 0 R\n%s>>\nendobj\n' % (
+            CATALOG_NUM, PAGES_NUM, self._catalog_extras)
+        xref_offset = catalog_offset + len(catalog)
+
+        size = graph.next_num
+        xref = b''.join([
+            b'xref\n0 %d\n0000000000 65535 f \n' % size,
+            b'%010d 00000 n \n' % catalog_offset,
+            b'%010d 00000 n \n' % tree_offset,
+            self._xref_entries,
+            b''.join(b'%010d 00000 n \n' % offset for offset in dynamic_offsets),
+            b'trailer\n<</Size %d\n/Root %d 0 R\n>>\nstartxref\n%d\n%%%%EOF\n' % (size, CATALOG_NUM, xref_offset),
+        ])
+        return [PDF_HEADER, self.block, dynamic_block, page_tree, catalog, xref]
@@ -0,0 +1,102 @@
+"""Profile one render: cProfile statistics plus sampled, collapsed call stacks.
+
+profile_render() runs a block under cProfile while a sampling thread
+records the stack of the profiled thread every few milliseconds. It writes
+<id>.pstats (load with pstats or snakeviz), <id>.txt (the top functions by
+cumulative time) and <id>.collapsed ("frame;frame;frame count" lines, the
+input format of flamegraph.pl and speedscope).
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+PROFILE_EXTENSIONS = ('pstats', 'txt', 'collapsed')
+SUMMARY_LINES = 60
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class StackSampler(threading.Thread):
+    """Samples the stack of one thread at a fixed interval and counts collapsed stacks"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+@contextmanager
+def profile_render(directory, profile_id, interval=0.002):
+    """Profile the enclosed block of the current thread; write its profile files to directory"""
+    profiler = cProfile.Profile()
+    sampler = StackSampler(threading.get_ident(), interval)
+    started = time.perf_counter()
+    sampler.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        sampler.stop()
+        elapsed = time.perf_counter() - started
+        write_profile(directory, profile_id, profiler, sampler, elapsed)
+
+
+def write_profile(directory, profile_id, profiler, sampler, elapsed):
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, profile_id)
+    profiler.dump_stats(f'{base}.pstats')
+
+    summary = io.StringIO()
+    summary.write(f'{profile_id}: {elapsed * 1000:.1f} ms wall, '
+                  f'{sum(sampler.stacks.values())} samples every {sampler.interval * 1000:g} ms\n\n')
+    pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(SUMMARY_LINES)
+    with open(f'{base}.txt', 'w', encoding='utf-8') as f:
+        f.write(summary.getvalue())
+
+    with open(f'{base}.collapsed', 'w', encoding='utf-8') as f:
+        f.write(sampler.collapsed())
+
+
+def prune_profiles(directory, keep):
+    """Delete all but the newest `keep` profiles in directory"""
+    try:
+        entries = [entry for entry in os.scandir(directory) if entry.name.endswith('.pstats')]
+    except FileNotFoundError:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[keep:]:
+        base = entry.path[:-len('.pstats')]
+        for ext in PROFILE_EXTENSIONS:
+            try:
+                os.remove(f'{base}.{ext}')
+            except OSError:
+                pass
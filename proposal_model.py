@@ -0,0 +1,433 @@
+"""Service catalog and per-request proposal model.
+
+The fee tables of the proposal are described declaratively in CATALOG:
+which form checkbox selects a service, which fields hold its fee and
+frequency, and the text shown for it. build_proposal_model() reads the
+submitted form once against the catalog; the PDF and Word backends only
+lay out the resulting ProposalModel.
+"""
+from datetime import datetime
+
+from fee_totals import Frequency, format_cents, parse_frequency, to_cents, total_fees, total_fees_batch
+
+
+# ==================== CATALOG ====================
+
+class Tiers:
+    """Nested tier table of a service (e.g. fee per transaction volume)"""
+    __slots__ = ('entries_key', 'headers', 'fields', 'defaults')
+
+    def __init__(self, entries_key, headers, fields, defaults):
+        self.entries_key = entries_key
+        self.headers = headers
+        self.fields = fields          # (form key, default) per column
+        self.defaults = defaults      # rows used when the form sends none
+
+
+class Service:
+    """One selectable fee line of a fee table"""
+    __slots__ = ('toggle', 'fee_key', 'label', 'notes', 'frequency_key', 'frequency',
+                 'default_fee', 'fee_suffix', 'tiers')
+
+    def __init__(self, toggle, fee_key, label=None, notes=None, frequency_key=None, frequency=None,
+                 default_fee='0', fee_suffix='', tiers=None):
+        self.toggle = toggle
+        self.fee_key = fee_key
+        self.label = label
+        self.notes = notes
+        self.frequency_key = frequency_key
+        self.frequency = frequency
+        self.default_fee = default_fee
+        self.fee_suffix = fee_suffix
+        self.tiers = tiers
+
+
+class ServiceGroup:
+    """Services listed under one heading cell; label None lists each service's own label"""
+    __slots__ = ('label', 'services', 'heading_style')
+
+    def __init__(self, label, services, heading_style='normal'):
+        self.label = label
+        self.services = services
+        self.heading_style = heading_style
+
+
+class FeeSection:
+    """One fee table of the proposal.
+
+    columns pairs each header with the part of a line it shows: 'label',
+    'frequency', 'notes' or 'fee'. totals is None, 'recurring' (per annum
+    and one-time rows, always shown) or 'one_time' (sum of the fees).
+    """
+    __slots__ = ('key', 'columns', 'groups', 'totals')
+
+    def __init__(self, key, columns, groups, totals=None):
+        self.key = key
+        self.columns = columns
+        self.groups = groups
+        self.totals = totals
+
+    @property
+    def services(self):
+        return [service for group in self.groups for service in group.services]
+
+
+def _heading(text):
+    return f'<font color="#C00000" face="Roboto-Bold"><b>{text}</b></font>'
+
+
+CATALOG = (
+    FeeSection('handover', (('Services', 'label'), ('Frequency', 'frequency'), ('Fee (In USD)', 'fee')), [
+        ServiceGroup(None, [
+            Service('includeHandover', 'handoverFee',
+                    label="""<font color="#C00000" face="Roboto-Bold"><b>
+    Handover from erstwhile service provider of various records under laws as mentioned below.
+This process does not entail conducting a due diligence.</b>
+</font><br/>
+• GST laws/regulations<br/>
+• Income Tax Act, 1961<br/>
+• Company's Act, 2013<br/>
+• Foreign Exchange Rules & Regulations""",
+                    frequency_key='handoverFrequency', frequency='One-time'),
+            Service('includeDueDiligence', 'dueDiligenceFee',
+                    label="""<font color="#C00000" face="Roboto-Bold">Basic due diligence from perspective of*–</font><br/>
+• Company's Act, 2013<br/>
+• Income Tax Act, 1961<br/>
+• Goods and Service Tax Act, 2017<br/>
+• Foreign Exchange Management Act, 1999""",
+                    frequency_key='ddFrequency', frequency='One-time'),
+        ]),
+    ]),
+
+    FeeSection('incorporation', (('Services', 'label'), ('One-time Fee', 'fee')), [
+        ServiceGroup(None, [
+            Service('includeIncorporation', 'incorporationFee', label=_heading('Incorporation') + """<br/>
+• PAN of the company included<br/>
+• TAN of the company included<br/>
+• Employees' Provident Fund and Miscellaneous Provision Act, Employees' State Insurance Corporation Act included"""),
+            Service('includeGST', 'gstRegFee', label=_heading('Goods & Service Tax (GST)') + """<br/><br/>
+Registration of single location with GST authorities.<br/>
+                      <br/>
+<i>Registration of every additional location with the GST authorities shall cost USD 100</i>"""),
+            Service('includeFCGPR', 'fcgprFee', label=_heading('FCGPR Filing with Reserve Bank of India') + """<br/>
+Filing of Forms and declaration with RBI as required under FEMA"""),
+            Service('includeROC', 'rocComplianceFee', label=_heading('Statutory Compliances with Registrar of Companies under Companies Act:') + """<br/>
+                      <br/>
+• Drafting of first board meeting documents<br/>
+                      <br/>
+• Guidance on capital infusion in bank account<br/><br/>
+• File form with Ministry for commencement of business (COC)<br/><br/>
+• Preparation of statutory shareholders register"""),
+        ]),
+    ]),
+
+    FeeSection('optional', (('Services', 'label'), ('Fees (In USD)', 'fee')), [
+        ServiceGroup(None, [
+            Service('includeIEC', 'iecFee', label='<font color="#C00000"face="Roboto-Bold">Import Export Code (IEC Code)</font>'),
+            Service('includePT', 'ptFee', label='<font color="#C00000"face="Roboto-Bold">Profession Tax (PT)</font><br/><br/>•Payments and return filing for company, its employees until the company\'s certificate of commencement is obtained'),
+            Service('includeBEN', 'benFee', label='<font color="#C00000" face="Roboto-Bold">Submission of for Significant Beneficial Ownership via form BEN-2</font>'),
+            Service('includeMGT', 'mgtFee', label='<font color="#C00000" face="Roboto-Bold">Filing of requisite forms with Registrar of Companies (ROC) with respect to beneficial and nominee shareholding (via Form MGT 4, MGT 5, MGT 6)</font>'),
+            Service('includePAN', 'panCardFee', label='<font color="#C00000" face="Roboto-Bold">Physical PAN Card of the company</font>'),
+            Service('includeTrademark', 'trademarkFee', label='<font color="#C00000" face="Roboto-Bold">Trademark Registration (exclusive of disbursement fees)</font>'),
+            Service('includeForeignPAN', 'foreignPanFee', label='<font color="#C00000" face="Roboto-Bold">PAN for foreign director</font>'),
+            Service('includeBankAssist', 'bankAssistFee', label='<font color="#C00000" face="Roboto-Bold">Assistance in opening of bank account</font>'),
+        ]),
+    ]),
+
+    FeeSection('nominee', (('Services', 'label'), ('Monthly Fee(in USD)', 'fee')), [
+        ServiceGroup(None, [
+            Service('includeRegOffice', 'registeredOfficeFee', label=_heading('Registered Office Service') + """<br/><br/>
+A refundable Security deposit @USD 2500 applies**. Refundable upon cessation of Registered office service."""),
+            Service('includeNomineeDir', 'nomineeDirectorFee', label=_heading('Nominee Director Service') + """<br/>
+A refundable Security deposit per nominee @USD 5000 applies*. Refundable upon cessation of Nominee Director Service<br/><br/>
+Director's fee for attending a physical or recorded or live board meeting @USD300 per director per board meeting<br/><br/>
+Every nominee director needs to be protected under a director’s indemnity policy. Premium of indemnity bond to be charged on actual basis. InCorp shall enter into a
+separate nominee directors’ agreement at the time of engagement. <br/><br/>
+To ensure the removal of a nominee director from registrations ***with various authorities
+where required, InCorp must be notified at least three months in advance. Additionally,
+professional fees for this service will continue to be charged until the removal is reflected
+by all relevant authorities as well as Bank & new director is appointed in his place.
+"""),
+        ]),
+    ]),
+
+    FeeSection('compliance', (('Services', 'label'), ('Frequency', 'frequency'), ('Notes', 'notes'), ('Fees (in USD)', 'fee')), [
+        ServiceGroup(_heading('Direct tax compliances'), [
+            Service('includeAdvanceTax', 'advanceTaxFee', frequency_key='advanceTaxFrequency', frequency='Quarterly',
+                    notes="1) Advance tax Compliances • Quarterly calculations and payment"),
+            Service('includeTDS', 'tdsFee', frequency_key='tdsFrequency', frequency='Monthly/Quarterly',
+                    notes="""2) TDS compliances:<br/>
+• Calculation and Payment of TDS<br/>
+• Filing of TDS Returns<br/><br/>
+(The above excludes cost of revisions of TDS returns)"""),
+            Service('includeIncomeTax', 'incomeTaxReturnFee', frequency_key='incomeTaxFrequency', frequency='Annual',
+                    notes="""3) Annual Income tax return<br/>
+Computation and filing of Annual Income tax Return<br/><br/>
+4) Statement of Financial Transactions (SFT) – Basic Reporting"""),
+        ], heading_style='section_header'),
+        ServiceGroup(_heading('Indirect tax compliances'), [
+            Service('includeGSTComp', 'gstComplianceFee', frequency_key='gstFrequency', frequency='Monthly and Annual',
+                    notes="""1) GST Compliances:<br/>
+• Calculations and payment of GST<br/>
+• Filing of monthly GST Returns<br/><br/>
+(The above excludes Annual returns of GST and revision of GST returns)"""),
+        ], heading_style='section_header'),
+        ServiceGroup(_heading('Company Law'), [
+            Service('includeCompanyLaw', 'companyLawFee', frequency_key='companyLawFrequency', frequency='Monthly',
+                    notes="""Company Law Compliances (Scope as per Annexure 1)<br/>
+Assistance on conduction of virtual board meeting – USD 150 per board meeting"""),
+        ]),
+        ServiceGroup(_heading('Foreign Exchange laws'), [
+            Service('includeRBIFiling', 'rbiFilingFee', frequency_key='rbiFilingFrequency', frequency='Annual',
+                    notes="Annual Filings with Reserve bank of India"),
+            Service('includeMasterFiling', 'masterFilingFee', frequency_key='masterFilingFrequency', frequency='Annual',
+                    notes="Annual Master Filing Form 3CEAA Part A (Basic Reporting)"),
+        ]),
+        ServiceGroup(_heading('Accounting'), [
+            Service('includeAcctSetup', 'accountingSetupFee', frequency_key='acctSetupFrequency', frequency='One time',
+                    notes="""Setup of accounting software<br/>
+• Liaison with the software expert for the setup<br/>
+• Ensure due configuration of the software with applicable laws<br/>
+• Short tutorial on guidance with respect to use of accounting software"""),
+            Service('includeAcctMaint', 'accountingMaintenanceFee', frequency_key='acctMaintFrequency', frequency='Monthly',
+                    default_fee='200', fee_suffix=' per month',
+                    notes="""Accounting and maintenance of books of accounts:<br/>
+• Data entry in accounting software<br/>
+• Weekly processing of Bank Reconciliation<br/>
+• Weekly processing of Purchase invoices<br/>
+• Maker access in bank account/preparing payments<br/>
+• Weekly forwarding of open suppliers/customers<br/>
+• Preparation of Monthly Profit & loss Statement and Balance Sheet""",
+                    tiers=Tiers('accountingEntries',
+                                ('No. of transactions per month', 'Fees per month (in USD)'),
+                                (('transactions', '0'), ('fee', '0')),
+                                (('Upto 20', '200'), ('20 - 50', '250'), ('50-80', '300')))),
+            Service('includeFinStmt', 'financialStatementsFee', frequency_key='finStmtFrequency', frequency='Annual',
+                    notes="""• Preparation of the financial Statements as per the Indian accounting Standards<br/>
+• Liaising with auditors for audit, compliance and related matters"""),
+        ]),
+        ServiceGroup(_heading('Payroll'), [
+            Service('includePayrollSetup', 'payrollSetupFee', frequency_key='payrollSetupFrequency', frequency='One time',
+                    notes='Payroll Setup (Scope as per Annexure 2)'),
+            Service('includeShopPOSH', 'shopPOSHFee', frequency_key='shopPOSHFrequency', frequency='One time',
+                    notes="""1. Obtaining Shop and establishment registration under Karnataka Shop and establishment act<br/>
+2. Drafting of POSH (Prevention of Sexual Harassment at Workplace) policy"""),
+            Service('includePayrollProc', 'payrollProcessingFee', frequency_key='payrollProcFrequency', frequency='Monthly',
+                    default_fee='125', fee_suffix=' per month',
+                    notes="Payroll Processing** (Scope as per Annexure 3)",
+                    tiers=Tiers('payrollEntries',
+                                ('No of employees', 'Amount in USD per month'),
+                                (('employees', ''), ('amount', '')),
+                                (('Upto 10 employees', '125 USD'), ('11 - 20 employees', '200 USD')))),
+            Service('includeLabourLaw', 'labourLawFee', frequency_key='labourLawFrequency', frequency='Monthly',
+                    notes="""Labour Law Compliances • Payments and return filing under:<br/>
+• Provident Fund<br/>
+• Employees State Insurance Corporation<br/>
+• Profession Tax<br/>
+•Labor Welfare Fund<br/>
+(for employees upto 20 – fixed fee)"""),
+            Service('includeAnnualReturns', 'annualReturnsFee', frequency_key='annualReturnsFrequency', frequency='Annual',
+                    notes="""Annual Return under the following labor law compliances:<br/>
+• Sexual Harassment of Women at Workplace Act, 2013<br/>
+• Shop and Establishment Act<br/>
+• Maternity Act<br/>
+• Gratuity Act"""),
+        ]),
+    ], totals='recurring'),
+
+    FeeSection('transfer_pricing', (('Services', 'label'), ('Frequency', 'frequency'), ('Notes', 'notes'), ('Fee (In USD)', 'fee')), [
+        ServiceGroup(None, [
+            Service('includeBenchmarking', 'benchmarkingFee', label=_heading('Benchmarking'), frequency='One-time',
+                    notes="""1. Assistance in conducting Functional, Asset and Risk
+Analysis of the proposed transaction to be entered
+between related parties. <br/>
+2. Assisting in arriving at the arm’s length price or margin
+range that may be applicable to the proposed
+transaction. Arm’s Length is price that Indian
+<company name> would have charged any other non related party/clients globally for similar services. This
+is a legal requirement from Indian Income tax to
+ensure Indian revenue department is not a loss of tax
+revenue. and
+<br/>
+Preparation of final benchmarking report*."""),
+            Service('includeIntercompany', 'intercompanyAgreementFee', label=_heading('Inter-company agreement'), frequency='One-time',
+                    notes="""Drafting and finalizing of Inter-company service agreement
+covering detailed description of service to be provided,
+components to be included while calculating cost of
+services, Invoicing period, Receivable cycle, withholding,
+ownership rights, effective date of agreement, indemnity
+etc. in compliance with the Transfer Pricing regulations
+defined under Income tax laws and other applicable Indian
+laws"""),
+        ]),
+    ], totals='one_time'),
+)
+
+SECTIONS = {section.key: section for section in CATALOG}
+
+
+# ==================== MODEL ====================
+
+class FeeLine:
+    """A selected service with the fee and frequency read from the form.
+
+    frequency and fee are the text shown in the table; period and cents
+    are the same as a Frequency and an integer amount for the totals.
+    """
+    __slots__ = ('service', 'frequency', 'period', 'fee', 'cents', 'tiers')
+
+    def __init__(self, service, frequency, cents, tiers):
+        self.service = service
+        self.frequency = frequency
+        self.period = parse_frequency(frequency)
+        self.fee = format_cents(cents)
+        self.cents = cents
+        self.tiers = tiers
+
+    @property
+    def display_fee(self):
+        return self.fee + self.service.fee_suffix
+
+
+class FeeGroup:
+    """Selected lines of one ServiceGroup"""
+    __slots__ = ('group', 'lines')
+
+    def __init__(self, group, lines):
+        self.group = group
+        self.lines = lines
+
+
+class FeeTable:
+    """Selected lines of one FeeSection plus its total rows.
+
+    amounts is the FeeTotals of the lines, or None when the section shows
+    no totals; totals holds the same as the rows shown in the table.
+    """
+    __slots__ = ('section', 'groups', 'amounts', 'totals')
+
+    def __init__(self, section, groups, amounts, totals):
+        self.section = section
+        self.groups = groups
+        self.amounts = amounts
+        self.totals = totals
+
+    @property
+    def lines(self):
+        return [line for group in self.groups for line in group.lines]
+
+
+class ProposalModel:
+    """Everything a backend needs from one submitted proposal form"""
+    __slots__ = ('company', 'date', 'client_name', 'client_designation', 'client_company',
+                 'client_address', 'salutation', 'scope', 'company_year', 'fees')
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+
+def _fee_cents(service, data):
+    try:
+        cents = to_cents(data.get(service.fee_key, service.default_fee))
+    except ValueError:
+        cents = None
+    # Blank, zero and unreadable fees show the catalog default
+    return cents or to_cents(service.default_fee)
+
+
+def _frequency(service, data):
+    if service.frequency_key:
+        frequency = data.get(service.frequency_key, service.frequency)
+        return frequency if frequency is None or isinstance(frequency, str) else str(frequency)
+    return service.frequency
+
+
+def _fee_line(service, data):
+    if data.get(service.toggle) != 'on':
+        return None
+    tiers = None
+    if service.tiers:
+        entries = data.get(service.tiers.entries_key) or []
+        if entries:
+            tiers = [tuple(entry.get(key, default) for key, default in service.tiers.fields) for entry in entries]
+        else:
+            tiers = list(service.tiers.defaults)
+    return FeeLine(service, _frequency(service, data), _fee_cents(service, data), tiers)
+
+
+def _total_period(section, period):
+    # A one-time section adds up every fee in it, whatever its frequency says
+    return Frequency.ONE_TIME if section.totals == 'one_time' else period
+
+
+def _amounts(section, lines):
+    """FeeTotals of a section's lines, or None if it shows no totals"""
+    if section.totals == 'recurring' or (section.totals == 'one_time' and lines):
+        return total_fees((_total_period(section, line.period), line.cents) for line in lines)
+    return None
+
+
+def _totals(section, amounts):
+    if amounts is None:
+        return []
+    if section.totals == 'recurring':
+        return [('Total costs (excluding one time costs)', f'{format_cents(amounts.annual)} per annum'),
+                ('One-time costs', f'{format_cents(amounts.one_time)} one time')]
+    return [('Total one-time costs', format_cents(amounts.one_time))]
+
+
+def build_fee_table(section, data):
+    """Read the selected services of one catalog section from the form"""
+    groups = []
+    for group in section.groups:
+        lines = [line for line in (_fee_line(service, data) for service in group.services) if line]
+        if lines:
+            groups.append(FeeGroup(group, lines))
+    lines = [line for group in groups for line in group.lines]
+    amounts = _amounts(section, lines)
+    return FeeTable(section, groups, amounts, _totals(section, amounts))
+
+
+def build_proposal_model(data):
+    """Parse a submitted proposal form once into a ProposalModel"""
+    proposal_date = data.get('proposalDate', datetime.now().strftime('%Y-%m-%d'))
+    try:
+        formatted_date = datetime.strptime(proposal_date, '%Y-%m-%d').strftime('%d. %m. %Y')
+    except:
+        formatted_date = proposal_date
+
+    return ProposalModel(
+        company=data.get('clientCompany', 'ABC India Pvt Ltd'),
+        date=formatted_date,
+        client_name=data.get('clientName', 'Client Name'),
+        client_designation=data.get('clientDesignation', 'Client Designation'),
+        client_company=data.get('clientCompany', 'Client Company Name'),
+        client_address=data.get('clientAddress', 'Client Company Address'),
+        salutation=(str(data.get('clientName') or '').split() or ['XXXX'])[0],
+        scope=data.get('scopeOfServices', '[NOTE TO INCORP STAFF - STAFF TO DESCRIBE IN BULLET POINTS THE ENTIRE SCOPE OF WORKS REQUIRED BY THE CLIENT/SERVICES TO BE RENDERED BY US + CLIENT PROFILE]'),
+        company_year=data.get('companyYear', 'YYYY'),
+        fees={section.key: build_fee_table(section, data) for section in CATALOG},
+    )
+
+
+# ==================== TOTALS ====================
+TOTAL_SECTIONS = tuple(section for section in CATALOG if section.totals)
+
+
+def proposal_totals(proposal):
+    """FeeTotals of every fee table of a ProposalModel that shows totals"""
+    return total_fees((_total_period(table.section, line.period), line.cents)
+                      for table in proposal.fees.values() if table.amounts is not None for line in table.lines)
+
+
+def batch_totals(payloads):
+    """FeeTotals of many submitted forms, read straight from the form data in one pass"""
+    def lines():
+        for index, data in enumerate(payloads):
+            for section in TOTAL_SECTIONS:
+                for service in section.services:
+                    if data.get(service.toggle) == 'on':
+                        period = _total_period(section, parse_frequency(_frequency(service, data)))
+                        yield index, period, _fee_cents(service, data)
+    return total_fees_batch(lines(), len(payloads))
@@ -0,0 +1,233 @@
+"""
+Production server: a preforking WSGI launcher for the proposal app.
+
+The parent binds the port, imports app.py with eager loading and renders a
+warm-up proposal (app.warm_worker_state), then forks the workers. Fonts,
+static PDFs, images and the warmed caches are shared copy-on-write, so a
+new worker serves its first request warm. Each worker runs one request at a
+time on the shared listening socket: rendering is CPU-bound, so one worker
+per core is what scales.
+
+    python serve.py                      # PORT (default 5000), one worker per available CPU
+    python serve.py --workers 4 --max-requests 1000
+
+Workers are recycled after --max-requests requests (plus up to
+--max-requests-jitter, so they do not all restart at once) and replaced
+if they die. SIGTERM or Ctrl-C stops accepting connections, lets in-flight
+requests and queued background jobs finish for up to --graceful-timeout
+seconds, then kills what is left.
+
+Background jobs are recorded in PROPOSAL_JOB_DIR (a temporary directory
+by default), so any worker can answer for a job another one accepted.
+/metrics and /cache_stats describe the worker that answered.
+"""
+import argparse
+import gc
+import math
+import os
+import random
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+# Everything is loaded in the parent before forking. The workers already use
+# every core, so one job process each.
+os.environ['PROPOSAL_LAZY_IMPORTS'] = '0'
+os.environ.setdefault('PROPOSAL_JOB_WORKERS', '1')
+# Job records must be visible to every worker
+OWN_JOB_DIR = not os.environ.get('PROPOSAL_JOB_DIR')
+if OWN_JOB_DIR:
+    os.environ['PROPOSAL_JOB_DIR'] = tempfile.mkdtemp(prefix='proposal-jobs-')
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+import app as app_module
+from telemetry import log
+
+POLL_SECONDS = 0.5
+MIN_WORKER_SECONDS = 1.0
+
+
+def available_cpus():
+    """CPUs this process may use: its affinity mask, capped by a cgroup v2 CPU quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+class _RequestHandler(WSGIRequestHandler):
+    # No keep-alive: an idle connection would hold a single-request worker
+    protocol_version = 'HTTP/1.0'
+
+
+class _WorkerServer(BaseWSGIServer):
+    """Werkzeug's WSGI server on an inherited socket, counting the requests it handled"""
+
+    multiprocess = True
+
+    def __init__(self, host, port, app, fd):
+        super().__init__(host, port, app, handler=_RequestHandler, fd=fd)
+        self.timeout = POLL_SECONDS
+        self.handled = 0
+
+    def process_request(self, request, client_address):
+        self.handled += 1
+        super().process_request(request, client_address)
+
+
+def run_worker(listener, host, max_requests, graceful_timeout):
+    """Serve until max_requests requests or SIGTERM, then finish queued jobs; never returns"""
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    # Ctrl-C reaches the whole process group; the parent turns it into a graceful stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    status = 0
+    try:
+        server = _WorkerServer(host, listener.getsockname()[1], app_module.app, listener.fileno())
+        while not stopping and server.handled < max_requests:
+            server.handle_request()
+        # Jobs accepted here are polled through the other workers; finish them before leaving
+        if not app_module.job_queue.drain(graceful_timeout):
+            log.warning("⚠️ Worker %d exiting with unfinished jobs", os.getpid())
+    except Exception:
+        log.exception("Worker %d failed", os.getpid())
+        status = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    os._exit(status)
+
+
+class Arbiter:
+    """Keeps `workers` forked workers running on one listening socket"""
+
+    def __init__(self, listener, host, workers, max_requests, max_requests_jitter, graceful_timeout):
+        self.listener = listener
+        self.host = host
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.children = {}
+        self.stopping = False
+
+    def spawn(self):
+        max_requests = self.max_requests + random.randint(0, self.max_requests_jitter)
+        pid = os.fork()
+        if pid == 0:
+            run_worker(self.listener, self.host, max_requests, self.graceful_timeout)
+        self.children[pid] = time.monotonic()
+
+    def reap(self):
+        """Collect exited workers; returns True if one died right after starting"""
+        crashed = False
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            started = self.children.pop(pid, None)
+            code = os.waitstatus_to_exitcode(status)
+            if self.stopping:
+                continue
+            if code == 0:
+                log.info("♻️ Worker %d recycled", pid)
+            else:
+                log.warning("⚠️ Worker %d exited with status %d", pid, code)
+                crashed = crashed or (started is not None and time.monotonic() - started < MIN_WORKER_SECONDS)
+        return crashed
+
+    def stop(self, signum, frame):
+        self.stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        while not self.stopping:
+            if self.reap():
+                # Do not fork in a tight loop while workers crash on startup
+                time.sleep(MIN_WORKER_SECONDS)
+            while not self.stopping and len(self.children) < self.workers:
+                self.spawn()
+            time.sleep(POLL_SECONDS)
+        self.shutdown()
+
+    def shutdown(self):
+        log.info("🛑 Stopping %d workers (up to %ds for in-flight requests)", len(self.children), self.graceful_timeout)
+        self.listener.close()
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.children):
+            log.warning("⚠️ Worker %d did not stop in time, killing it", pid)
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+            del self.children[pid]
+
+
+def serve(host, port, workers, max_requests, max_requests_jitter, graceful_timeout):
+    listener = socket.create_server((host, port), backlog=2048)
+    app_module.warm_worker_state()
+    # Objects created so far are never collected; keep the collector from writing to their pages
+    gc.collect()
+    gc.freeze()
+    log.info("🚀 Serving on http://%s:%d with %d workers", host, listener.getsockname()[1], workers)
+    try:
+        Arbiter(listener, host, workers, max_requests, max_requests_jitter, graceful_timeout).run()
+    finally:
+        if OWN_JOB_DIR:
+            shutil.rmtree(os.environ['PROPOSAL_JOB_DIR'], ignore_errors=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the proposal app with preforked workers')
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('PROPOSAL_WORKERS', 0)),
+                        help='worker processes (default: one per available CPU)')
+    parser.add_argument('--max-requests', type=int, default=int(os.environ.get('PROPOSAL_MAX_REQUESTS', 1000)),
+                        help='recycle a worker after this many requests')
+    parser.add_argument('--max-requests-jitter', type=int,
+                        default=int(os.environ.get('PROPOSAL_MAX_REQUESTS_JITTER', 100)))
+    parser.add_argument('--graceful-timeout', type=float,
+                        default=float(os.environ.get('PROPOSAL_GRACEFUL_TIMEOUT', 30)),
+                        help='seconds in-flight requests get to finish on shutdown')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    serve(args.host, args.port, args.workers or available_cpus(), args.max_requests,
+          args.max_requests_jitter, args.graceful_timeout)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""Request tracing, pipeline stage timings and Prometheus metrics.
+
+Every request runs inside a trace (a short ID, taken from X-Request-ID when
+the caller sends one). stage() times a step of the pipeline into the
+proposal_stage_seconds histogram and into the current trace, which app.py
+reports back as a Server-Timing header. REGISTRY.render() produces the
+Prometheus text exposition format without needing prometheus_client.
+
+log is the leveled logger of the hot path (PROPOSAL_LOG_LEVEL, default
+INFO); each line carries the trace ID of the request that wrote it.
+"""
+import logging
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+# ==================== METRICS ====================
+def _label_text(names, values):
+    if not names:
+        return ''
+    pairs = ','.join('%s="%s"' % (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+                     for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, one series per label combination"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, _label_text(self.labels, key), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield (f'{self.name}_bucket', _label_text(self.labels + ('le',), key + (_number(bound),)),
+                       cumulative)
+            yield f'{self.name}_sum', _label_text(self.labels, key), total
+            yield f'{self.name}_count', _label_text(self.labels, key), count
+
+
+class CallbackMetric:
+    """Values read at scrape time from a callback returning {label values: value}.
+
+    kind is 'gauge', or 'counter' for totals kept elsewhere (e.g. cache stats).
+    """
+
+    def __init__(self, name, help, labels, read, kind='gauge'):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.read = read
+        self.kind = kind
+
+    def samples(self):
+        try:
+            values = self.read()
+        except Exception as e:
+            log.warning('Metric %s unavailable: %s', self.name, e)
+            return
+        for key, value in sorted(values.items()):
+            yield self.name, _label_text(self.labels, key), value
+
+
+class Registry:
+    """The metrics exposed at /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def callback(self, name, help, labels, read, kind='gauge'):
+        return self.register(CallbackMetric(name, help, labels, read, kind))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(f'{name}{labels} {_number(value)}' for name, labels, value in metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram('proposal_stage_seconds', 'Duration of proposal pipeline stages', ('stage',))
+
+
+# ==================== TRACING ====================
+_context = threading.local()
+
+
+def new_trace_id():
+    return uuid.uuid4().hex[:16]
+
+
+def current_trace_id():
+    return getattr(_context, 'trace_id', None)
+
+
+def start_trace(trace_id=None):
+    """Begin a trace on this thread; returns its ID"""
+    _context.trace_id = trace_id or new_trace_id()
+    _context.stages = []
+    return _context.trace_id
+
+
+def end_trace():
+    """Finish the trace of this thread; returns its [(stage, seconds)]"""
+    stages = getattr(_context, 'stages', None) or []
+    _context.trace_id = None
+    _context.stages = None
+    return stages
+
+
+@contextmanager
+def stage(name):
+    """Time one pipeline stage into the histogram and the current trace"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        stages = getattr(_context, 'stages', None)
+        if stages is not None:
+            stages.append((name, elapsed))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('%s took %.1f ms', name, elapsed * 1000)
+
+
+def server_timing(stages):
+    """Server-Timing header value for a trace's stages"""
+    return ', '.join(f'{name};dur={seconds * 1000:.1f}' for name, seconds in stages)
+
+
+# ==================== LOGGING ====================
+class _TraceFilter(logging.Filter):
+    def filter(self, record):
+        record.trace_id = current_trace_id() or '-'
+        return True
+
+
+log = logging.getLogger('proposal')
+if not log.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(trace_id)s] %(message)s'))
+    _handler.addFilter(_TraceFilter())
+    log.addHandler(_handler)
+    log.setLevel(os.environ.get('PROPOSAL_LOG_LEVEL', 'INFO').upper())
+    log.propagate = False
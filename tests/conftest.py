@@ -0,0 +1,27 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """app.py imported once, with one job worker and scratch directories"""
+    scratch = tmp_path_factory.mktemp('app')
+    os.environ.update({
+        'PROPOSAL_LOG_LEVEL': 'WARNING',
+        'PROPOSAL_JOB_WORKERS': '1',
+        'PROPOSAL_PROFILE_TOKEN': 'test-token',
+        'PROPOSAL_PROFILE_DIR': str(scratch / 'profiles'),
+        'PROPOSAL_SCRATCH_DIR': str(scratch),
+    })
+    return importlib.import_module('app')
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
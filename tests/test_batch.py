@@ -0,0 +1,75 @@
+import io
+import json
+import zipfile
+
+
+def _batch(client, body, fmt='pdf'):
+    response = client.post(f'/generate_proposals/batch?format={fmt}', json=body)
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.data))
+    assert archive.testzip() is None
+    return archive, json.loads(archive.read('manifest.json'))
+
+
+def test_batch_reports_bad_items_and_keeps_streaming(client):
+    body = {'base': {'includeTDS': 'on', 'tdsFee': '100', 'tdsFrequency': 'Monthly'},
+            'clients': [{'clientCompany': 'Alpha'}, 5, {'clientCompany': 7},
+                        {'clientCompany': 'Huge', 'tdsFee': '1e10000000'}]}
+    archive, manifest = _batch(client, body)
+    items = {item['index']: item for item in manifest['items']}
+    assert sorted(items) == [0, 1, 2, 3]
+    assert items[0]['file'] in archive.namelist()
+    assert items[0]['total_annual_cost'] == 1200
+    assert items[1]['error'] == 'Payload must be a JSON object'
+    assert 'error' in items[2] and 'file' not in items[2]
+    # An unreadable fee falls back to the default, like a single request
+    assert items[3]['total_annual_cost'] == 0 and items[3]['file'] in archive.namelist()
+    assert (manifest['succeeded'], manifest['failed']) == (2, 2)
+    assert archive.read(items[0]['file']).startswith(b'%PDF-')
+
+
+def test_batch_rejects_bad_requests(client):
+    assert client.post('/generate_proposals/batch', json={'x': 1}).status_code == 400
+    assert client.post('/generate_proposals/batch', json=[]).status_code == 400
+    assert client.post('/generate_proposals/batch?format=xls', json=[{}]).status_code == 400
+
+
+def test_batch_item_failure_after_render_does_not_abort_archive(client, app_module, monkeypatch):
+    batch_totals = app_module.batch_totals
+
+    def failing_totals(payloads):
+        if payloads[0].get('clientCompany') == 'Broken':
+            raise RuntimeError('totals failed')
+        return batch_totals(payloads)
+
+    monkeypatch.setattr(app_module, 'batch_totals', failing_totals)
+    archive, manifest = _batch(client, [{'clientCompany': 'Broken'}, {'clientCompany': 'Fine'}])
+    items = {item['index']: item for item in manifest['items']}
+    assert items[0]['error'] == 'totals failed'
+    assert items[1]['file'] in archive.namelist()
+
+
+def test_batch_renders_share_the_job_queue_limit(client, app_module, monkeypatch):
+    queue = app_module.job_queue
+    submit_render = queue._submit_render
+    futures = []
+    running_at_submit = []
+
+    def recording_submit(kind, data, started_path=None):
+        running_at_submit.append(sum(not future.done() for future in futures))
+        futures.append(submit_render(kind, data, started_path))
+        return futures[-1]
+
+    monkeypatch.setattr(queue, 'queue_limit', 1)
+    monkeypatch.setattr(queue, '_submit_render', recording_submit)
+    archive, manifest = _batch(client, [{'clientCompany': f'Slot {n}'} for n in range(3)])
+    assert manifest['succeeded'] == 3
+    assert running_at_submit == [0, 0, 0]
+    assert queue.drain(10)
+
+
+def test_batch_is_refused_while_the_job_queue_is_full(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module.job_queue, 'queue_limit', 0)
+    response = client.post('/generate_proposals/batch', json=[{'clientCompany': 'Alpha'}])
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '5'
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+from docx import Document
+
+import docx_export
+
+
+def write_fragment(path, identifier):
+    fragment = Document()
+    fragment.core_properties.identifier = identifier
+    fragment.save(path)
+
+
+@pytest.fixture
+def slow_build(monkeypatch):
+    """build_docx_fragment that takes a while and records the paths it built"""
+    built = []
+    started = threading.Event()
+
+    def build(pdf_path, docx_path):
+        started.set()
+        time.sleep(0.3)
+        write_fragment(docx_path, docx_export._file_sha256(pdf_path))
+        built.append(docx_path)
+
+    monkeypatch.setattr(docx_export, 'build_docx_fragment', build)
+    return built, started
+
+
+def test_bundled_fragment_is_used_without_rebuilding(tmp_path, slow_build):
+    built, _ = slow_build
+    pdf = tmp_path / 'insert.pdf'
+    pdf.write_bytes(b'%PDF-1.4 insert')
+    bundled = tmp_path / 'bundled'
+    bundled.mkdir()
+    write_fragment(bundled / 'insert.docx', docx_export._file_sha256(pdf))
+    cache = docx_export.DocxFragmentCache(str(tmp_path / 'cache'), str(bundled))
+    assert cache.get(str(pdf)) is not None
+    assert cache.get(str(pdf)) is not None
+    assert built == []
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'rebuilds': 0}
+
+
+def test_stale_fragment_is_rebuilt_into_the_cache_directory(tmp_path, slow_build):
+    built, _ = slow_build
+    pdf = tmp_path / 'insert.pdf'
+    pdf.write_bytes(b'%PDF-1.4 replaced insert')
+    bundled = tmp_path / 'bundled'
+    bundled.mkdir()
+    write_fragment(bundled / 'insert.docx', 'hash of the old insert')
+    cache = docx_export.DocxFragmentCache(str(tmp_path / 'cache'), str(bundled))
+    assert cache.get(str(pdf)).core_properties.identifier == docx_export._file_sha256(pdf)
+    assert built == [str(tmp_path / 'cache' / 'insert.docx')]
+    assert Document(bundled / 'insert.docx').core_properties.identifier == 'hash of the old insert'
+
+
+def test_rebuild_runs_once_and_outside_the_lock(tmp_path, slow_build):
+    built, started = slow_build
+    pdf = tmp_path / 'insert.pdf'
+    pdf.write_bytes(b'%PDF-1.4 insert')
+    cache = docx_export.DocxFragmentCache(str(tmp_path / 'cache'))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(str(pdf)))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    assert started.wait(5)
+    # Stats (and other fragments) do not wait for the rebuild
+    began = time.monotonic()
+    cache.stats()
+    assert time.monotonic() - began < 0.1
+    for thread in threads:
+        thread.join()
+    assert len(built) == 1
+    assert len(results) == 4 and all(result is results[0] for result in results)
@@ -0,0 +1,138 @@
+import math
+
+import pytest
+
+from fee_preview import proposal_preview
+from fee_totals import (
+    MAX_DIGITS,
+    Frequency,
+    FeeTotals,
+    cents_value,
+    format_cents,
+    parse_frequency,
+    to_cents,
+    total_fees,
+    total_fees_batch,
+)
+from proposal_model import batch_totals, build_proposal_model, proposal_totals
+
+
+@pytest.mark.parametrize('value, cents', [
+    ('1500', 150000),
+    (' 1500 ', 150000),
+    ('1,500', 150000),
+    ('1,500.50', 150050),
+    ('0.005', 1),
+    ('-250', -25000),
+    ('-1,500.505', -150051),
+    ('1e3', 100000),
+    (99, 9900),
+    (1200.0, 120000),
+    (0, 0),
+    ('1e-10000000000', 0),
+])
+def test_to_cents(value, cents):
+    assert to_cents(value) == cents
+
+
+@pytest.mark.parametrize('value', [None, '', '   ', True])
+def test_to_cents_blank(value):
+    assert to_cents(value) is None
+
+
+@pytest.mark.parametrize('value', [
+    'abc', '$100', '1.2.3', 'nan', 'NaN', 'inf', '-Infinity', math.inf, math.nan, '²',
+    '1e5000', '1e10000000', '9' * (MAX_DIGITS + 1), '9' * 5000,
+    10 ** MAX_DIGITS, '999999999999999.995', [1], {'fee': 1},
+])
+def test_to_cents_rejects(value):
+    with pytest.raises(ValueError):
+        to_cents(value)
+
+
+def test_to_cents_largest_amount():
+    largest = '9' * MAX_DIGITS
+    assert format_cents(to_cents(largest)) == f'{int(largest):,}'
+
+
+@pytest.mark.parametrize('cents, text', [
+    (0, '0'),
+    (150000, '1,500'),
+    (150050, '1,500.50'),
+    (5, '0.05'),
+    (-150051, '-1,500.51'),
+    (-5, '-0.05'),
+    (123456789012345600, '1,234,567,890,123,456'),
+])
+def test_format_cents(cents, text):
+    assert format_cents(cents) == text
+
+
+def test_cents_value():
+    assert cents_value(150000) == 1500 and isinstance(cents_value(150000), int)
+    assert cents_value(150050) == 1500.5
+
+
+@pytest.mark.parametrize('text, frequency', [
+    ('Monthly', Frequency.MONTHLY),
+    ('Monthly and Annual', Frequency.MONTHLY),
+    ('Monthly/Quarterly', Frequency.MONTHLY),
+    ('  QUARTERLY ', Frequency.QUARTERLY),
+    ('Annual', Frequency.ANNUAL),
+    ('One-time', Frequency.ONE_TIME),
+    ('One time', Frequency.ONE_TIME),
+    ('Billed annually', Frequency.ANNUAL),
+    ('Weekly', Frequency.OTHER),
+    (None, Frequency.OTHER),
+    (12, Frequency.OTHER),
+    (Frequency.QUARTERLY, Frequency.QUARTERLY),
+])
+def test_parse_frequency(text, frequency):
+    assert parse_frequency(text) is frequency
+
+
+def test_total_fees():
+    totals = total_fees([(Frequency.MONTHLY, 100), (Frequency.QUARTERLY, 1000), (Frequency.ANNUAL, 7),
+                         (Frequency.ONE_TIME, 50), (Frequency.ONE_TIME, 25), (Frequency.OTHER, 999)])
+    assert totals.annual == 100 * 12 + 1000 * 4 + 7
+    assert totals.one_time == 75
+    assert totals.by_frequency[Frequency.OTHER] == 999
+    assert FeeTotals().as_dict()['total_annual_cost'] == 0
+
+
+def test_total_fees_batch_keeps_proposals_apart():
+    totals = total_fees_batch([(0, Frequency.MONTHLY, 100), (2, Frequency.ONE_TIME, 5), (0, Frequency.ONE_TIME, 1)], 3)
+    assert [(t.annual, t.one_time) for t in totals] == [(1200, 1), (0, 0), (0, 5)]
+
+
+def _form(**fees):
+    data = {'clientCompany': 'Acme'}
+    for key, (toggle, frequency_key, fee, frequency) in fees.items():
+        data[toggle] = 'on'
+        data[key] = fee
+        if frequency_key:
+            data[frequency_key] = frequency
+    return data
+
+
+def test_model_totals_and_fallback():
+    data = _form(tdsFee=('includeTDS', 'tdsFrequency', '100', 'Monthly'),
+                 advanceTaxFee=('includeAdvanceTax', 'advanceTaxFrequency', '1e5000', 'Quarterly'),
+                 incomeTaxReturnFee=('includeIncomeTax', 'incomeTaxFrequency', '1e10000000', 'Annual'),
+                 acctSetupFee=('includeAcctSetup', 'acctSetupFrequency', '', 'One time'),
+                 benchmarkingFee=('includeBenchmarking', None, '1,000.50', None))
+    data['accountingSetupFee'] = data.pop('acctSetupFee')
+    proposal = build_proposal_model(data)
+    compliance = proposal.fees['compliance']
+    # Unreadable and blank fees show the catalog default ('0'), as before
+    assert [line.fee for line in compliance.lines] == ['0', '100', '0', '0']
+    assert compliance.totals == [('Total costs (excluding one time costs)', '1,200 per annum'),
+                                 ('One-time costs', '0 one time')]
+    assert proposal.fees['transfer_pricing'].totals == [('Total one-time costs', '1,000.50')]
+
+    totals = proposal_totals(proposal)
+    assert (totals.annual, totals.one_time) == (120000, 100050)
+    [batch] = batch_totals([data])
+    assert batch.by_frequency == totals.by_frequency
+    preview = proposal_preview(proposal)
+    assert (preview['total_annual_cost'], preview['total_onetime_cost']) == (1200, 1000.5)
@@ -0,0 +1,92 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+
+def _wait_done(queue, job_id, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job.status in ('done', 'failed'):
+            return job
+        time.sleep(0.1)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+@pytest.fixture
+def queues(app_module, tmp_path):
+    """Two job queues sharing one state directory, like two server workers"""
+    first = app_module.JobQueue(1, 4, 10, str(tmp_path))
+    second = app_module.JobQueue(1, 4, 10, str(tmp_path))
+    yield first, second
+    for queue in (first, second):
+        if queue._executor is not None:
+            queue._executor.shutdown()
+
+
+def test_job_is_visible_from_another_queue(queues):
+    first, second = queues
+    job = first.submit('pdf', {'clientCompany': 'Shared Job Co', 'proposalDate': '2026-01-02'})
+    seen = second.get(job.id)
+    assert seen is not None and seen.status in ('queued', 'running', 'done')
+    assert first.drain(120)
+    done = _wait_done(second, job.id)
+    assert done.status == 'done'
+    assert done.filename == job.filename
+    assert second.result(done).startswith(b'%PDF-')
+    assert second.get('not-a-job') is None and second.get('../../etc') is None
+
+
+def test_job_of_exited_process_is_reported_failed(queues, tmp_path):
+    _, second = queues
+    dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+    dead.wait()
+    record = {'id': 'abc123', 'kind': 'pdf', 'filename': 'x.pdf', 'cache_key': 'k', 'owner': dead.pid,
+              'submitted_at': time.time(), 'started_at': None, 'finished_at': None, 'error': None}
+    (tmp_path / 'abc123.json').write_text(json.dumps(record))
+    job = second.get('abc123')
+    assert job.status == 'failed'
+    assert 'exited' in job.to_dict()['error']
+
+
+def test_retention_prunes_the_state_directory(app_module, tmp_path):
+    queue = app_module.JobQueue(1, 4, 2, str(tmp_path))
+    for i in range(5):
+        record = {'id': f'old{i}', 'kind': 'pdf', 'filename': 'x.pdf', 'cache_key': 'k', 'owner': os.getpid(),
+                  'submitted_at': 0, 'started_at': 0, 'finished_at': 1, 'error': None}
+        (tmp_path / f'old{i}.json').write_text(json.dumps(record))
+        (tmp_path / f'old{i}.result').write_bytes(b'%PDF-')
+        os.utime(tmp_path / f'old{i}.json', (i, i))
+    queue._evict()
+    assert sorted(os.listdir(tmp_path)) == ['old3.json', 'old3.result', 'old4.json', 'old4.result']
+
+
+def test_job_routes(client):
+    response = client.post('/jobs', json={'clientCompany': 'Route Co', 'proposalDate': '2026-01-03'})
+    assert response.status_code == 202
+    status_url = response.json['status_url']
+    deadline = time.monotonic() + 120
+    while client.get(status_url).json['status'] not in ('done', 'failed'):
+        assert time.monotonic() < deadline
+        time.sleep(0.1)
+    result = client.get(response.json['result_url'])
+    assert result.status_code == 200 and result.data.startswith(b'%PDF-')
+    assert client.get('/jobs/unknown').status_code == 404
+    assert client.post('/jobs?format=xls', json={}).status_code == 400
+
+
+def test_job_filename_uses_the_file_extension(app_module):
+    job = app_module.ProposalJob('docx:pdf2docx', {'clientCompany': 'Ext Co'})
+    assert job.filename.startswith('InCorp_Proposal_Ext_Co_') and job.filename.endswith('.docx')
+    assert app_module.ProposalJob('pdf', {}).filename.endswith('.pdf')
+
+
+@pytest.mark.parametrize('body', [[{'clientCompany': 'A'}], 'text', 5])
+def test_create_job_rejects_non_object_bodies(client, body):
+    response = client.post('/jobs', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.json
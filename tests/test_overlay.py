@@ -0,0 +1,58 @@
+import io
+
+from pypdf import PdfReader
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+import overlay
+
+MINIMAL = {'clientName': 'John Smith', 'clientCompany': 'Tiny Co', 'proposalDate': '2026-01-15'}
+
+
+def template_pdf(fields):
+    """A one-page letter-size template with the artwork text 'Letterhead' and the given text fields"""
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    c.drawString(72, 720, 'Letterhead')
+    for i, (name, options) in enumerate(fields.items()):
+        c.acroForm.textfield(name=name, x=72, y=600 - 40 * i, width=300, height=20, borderWidth=0, **options)
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def test_prepare_template_turns_fields_into_anchors():
+    template = overlay.prepare_template(template_pdf({
+        'client_name': {'fontName': 'Helvetica-Bold', 'fontSize': 11},
+        'page_label': {'fontName': 'Helvetica', 'fontSize': 0},
+    }))
+    assert template.field_names == {'client_name', 'page_label'}
+    name = next(anchor for anchor in template.anchors[0] if anchor.name == 'client_name')
+    assert (name.font, name.size) == ('Helvetica-Bold', 11)
+    assert name.rect == (72, 600, 372, 620)
+    reader = PdfReader(io.BytesIO(template.pdf))
+    assert '/AcroForm' not in reader.trailer['/Root']
+    assert '/Annots' not in reader.pages[0]
+    assert overlay.OVERLAY_FORM in reader.pages[0]['/Resources']['/XObject']
+
+
+def test_fill_writes_values_and_skips_blank_ones():
+    template = overlay.prepare_template(template_pdf({'client_name': {}, 'salutation': {}}))
+    content = overlay.fill(template.anchors[0], {'client_name': 'Ann (CFO)', 'salutation': ''})
+    assert b'(Ann \\(CFO\\)) Tj' in content
+    assert content.count(b'Tj') == 1
+
+
+def test_overlay_engine_fills_the_letter_template(app_module, client, tmp_path, monkeypatch):
+    (tmp_path / 'letter.pdf').write_bytes(template_pdf({'client_name': {}, 'client_company': {}}))
+    monkeypatch.setattr(app_module, 'PDF_ENGINE', 'overlay')
+    monkeypatch.setattr(app_module, 'OVERLAY_DIR', str(tmp_path))
+    # A payload of its own, so no result rendered by the layout engine is reused
+    response = client.post('/generate_proposal', json=dict(MINIMAL, clientName='Olive Overlay'))
+    assert response.status_code == 200
+    reader = PdfReader(io.BytesIO(response.data))
+    texts = [' '.join(page.extract_text().split()) for page in reader.pages]
+    letter_page = texts[4]
+    assert 'Letterhead' in letter_page and 'Olive Overlay' in letter_page and 'Tiny Co' in letter_page
+    # The other groups are still laid out
+    assert 'SCOPE OF SERVICES' in texts[5]
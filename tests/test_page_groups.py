@@ -0,0 +1,44 @@
+import io
+
+from pypdf import PdfReader
+
+MINIMAL = {'clientName': 'John Smith', 'clientCompany': 'Tiny Co', 'proposalDate': '2026-01-15'}
+
+
+def render(client, payload):
+    response = client.post('/generate_proposal', json=payload)
+    assert response.status_code == 200
+    return PdfReader(io.BytesIO(response.data))
+
+
+def test_fee_sections_share_pages(app_module, client):
+    # Tables C and D follow on from the fee tables instead of starting new pages
+    assert [group.name for group in app_module.PAGE_GROUPS] == ['cover', 'letter', 'fees']
+    reader = render(client, MINIMAL)
+    assert len(reader.pages) == 16
+    fees_page = ' '.join(reader.pages[6].extract_text().split())
+    assert 'C. Accounting / Tax / Payroll' in fees_page
+
+
+def test_cached_groups_keep_page_count_and_labels(client):
+    first = render(client, dict(MINIMAL, includeAdvanceTax='on', advanceTaxFee='1000'))
+    edited = render(client, dict(MINIMAL, includeAdvanceTax='on', advanceTaxFee='1001'))
+    assert len(edited.pages) == len(first.pages)
+    assert edited.page_labels == [str(number) for number in range(1, len(edited.pages) + 1)]
+
+
+def test_fee_edit_lays_out_only_the_fees_group(app_module, client, monkeypatch):
+    laid_out = []
+    render_page_group = app_module.render_page_group
+
+    def recording_render(group, elements):
+        laid_out.append(group.name)
+        return render_page_group(group, elements)
+
+    monkeypatch.setattr(app_module, 'render_page_group', recording_render)
+    payload = dict(MINIMAL, clientName='Incremental', includeAdvanceTax='on', advanceTaxFee='2000')
+    render(client, payload)
+    assert 'letter' in laid_out and 'fees' in laid_out
+    laid_out.clear()
+    render(client, dict(payload, advanceTaxFee='2001'))
+    assert laid_out == ['fees']
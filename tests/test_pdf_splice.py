@@ -0,0 +1,98 @@
+import io
+import warnings
+
+import pytest
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ArrayObject, DecodedStreamObject, DictionaryObject, NameObject, NumberObject
+from reportlab.pdfgen import canvas
+
+from pdf_splice import SpliceTemplate, replace_stream
+
+
+def reportlab_pdf(*texts):
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=(300, 400))
+    for text in texts:
+        c.drawString(20, 200, text)
+        c.showPage()
+    c.save()
+    return PdfReader(io.BytesIO(buffer.getvalue()))
+
+
+def inherited_pdf(*texts):
+    """Pages whose resources, media box and rotation are all inherited from the page tree"""
+    writer = PdfWriter()
+    for text in texts:
+        page = writer.add_blank_page(200, 300)
+        for key in ('/MediaBox', '/Resources'):
+            del page[key]
+        contents = DecodedStreamObject()
+        contents.set_data(b'BT /F1 12 Tf 10 10 Td (%s) Tj ET' % text.encode('ascii'))
+        page[NameObject('/Contents')] = writer._add_object(contents)
+    font = DictionaryObject({NameObject('/Type'): NameObject('/Font'), NameObject('/Subtype'): NameObject('/Type1'),
+                             NameObject('/BaseFont'): NameObject('/Helvetica')})
+    tree = writer._root_object['/Pages']
+    tree[NameObject('/Resources')] = DictionaryObject(
+        {NameObject('/Font'): DictionaryObject({NameObject('/F1'): writer._add_object(font)})})
+    tree[NameObject('/MediaBox')] = ArrayObject(NumberObject(n) for n in (0, 0, 200, 300))
+    tree[NameObject('/Rotate')] = NumberObject(90)
+    writer.add_outline_item(texts[0], 0)
+    writer.add_named_destination(texts[-1], len(texts) - 1)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    reader = PdfReader(io.BytesIO(buffer.getvalue()))
+    # pypdf copies inherited attributes down onto the pages it lists; undo that
+    for page in reader.pages:
+        for key in ('/MediaBox', '/Resources', '/Rotate'):
+            del page.indirect_reference.get_object()[key]
+    return reader
+
+
+def open_spliced(chunks):
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        return PdfReader(io.BytesIO(b''.join(chunks)), strict=True)
+
+
+def page_texts(reader):
+    return [page.extract_text().strip() for page in reader.pages]
+
+
+@pytest.fixture(scope='module')
+def template():
+    return SpliceTemplate([inherited_pdf('Static 1', 'Static 2'), reportlab_pdf('Static 3')])
+
+
+def test_layout_sets_page_order_and_count(template):
+    first, second = reportlab_pdf('Cover'), reportlab_pdf('Letter', 'Fees')
+    dynamic = list(first.pages) + list(second.pages)
+    reader = open_spliced(template.render(dynamic, [('dynamic', 0, 1), ('static', 0), ('dynamic', 1, 3), ('static', 1)]))
+    assert len(reader.pages) == 6
+    assert page_texts(reader) == ['Cover', 'Static 1', 'Static 2', 'Letter', 'Fees', 'Static 3']
+    assert reader.page_labels == ['1', '2', '3', '4', '5', '6']
+
+
+def test_pages_keep_inherited_attributes(template):
+    reader = open_spliced(template.render([], [('static', 0)]))
+    for page in reader.pages:
+        assert [float(n) for n in page.mediabox] == [0, 0, 200, 300]
+        assert page['/Rotate'] == 90
+        assert '/F1' in page['/Resources']['/Font']
+    assert page_texts(reader) == ['Static 1', 'Static 2']
+
+
+def test_catalog_keeps_outline_and_names(template):
+    reader = open_spliced(template.render([], [('static', 0), ('static', 1)]))
+    assert [item.title for item in reader.outline] == ['Static 1']
+    assert reader.get_destination_page_number(reader.outline[0]) == 0
+    assert reader.get_destination_page_number(reader.named_destinations['Static 2']) == 1
+
+
+def test_replacements_leave_the_source_reader_alone(template):
+    source = reportlab_pdf('Original')
+    page = source.pages[0]
+    contents = page['/Contents'].get_object()
+    replacement = replace_stream(contents, contents.get_data().replace(b'Original', b'Replaced'))
+    reader = open_spliced(template.render([page], [('dynamic', 0, 1)], [(page.raw_get('/Contents'), replacement)]))
+    assert page_texts(reader) == ['Replaced']
+    assert page.extract_text().strip() == 'Original'
@@ -0,0 +1,50 @@
+import pytest
+
+from fee_preview import markup_html, markup_text
+
+
+def test_markup_html_maps_reportlab_tags():
+    assert markup_html('<b>Fees</b> & <i>notes</i><br/>') == '<b>Fees</b> &amp; <i>notes</i><br>'
+    assert (markup_html('<font color="#C00000"face="MicrosoftSansSerif-Bold">Red</font>')
+            == '<span style="color:#C00000;font-weight:bold">Red</span>')
+    # Unknown tags are dropped like ReportLab does, and nothing is injected through attributes
+    assert markup_html('<para align="center"><script>x</script></para>') == 'x'
+    assert markup_html('<font color="red;background:url(x)">a</font>') == '<span>a</span>'
+
+
+def test_markup_text_is_one_line():
+    assert markup_text('<b>Annual</b><br/>  filing\n fee') == 'Annual filing fee'
+
+
+def test_preview_route_matches_the_pdf_sections(client):
+    response = client.post('/preview', json={'clientCompany': 'Tiny Co', 'includeTDS': 'on', 'tdsFee': '100',
+                                             'tdsFrequency': 'Monthly'})
+    assert response.status_code == 200
+    preview = response.get_json()
+    sections = {section['section']: section for section in preview['sections']}
+    tds = next(row for row in sections['compliance']['rows'] if row['service'] == 'tdsFee')
+    assert (tds['fee'], tds['frequency']) == ('100', 'Monthly')
+    assert preview['total_annual_cost'] == 1200
+    assert preview['html'].count('<table class="fee-table"') == len(preview['sections'])
+
+
+def test_preview_rejects_non_objects(client):
+    response = client.post('/preview', json=[1, 2])
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Expected a JSON object'}
+
+
+@pytest.mark.parametrize('name', ['', '   '])
+def test_preview_of_a_blank_form(client, name):
+    # The form previews on load, before a client name is typed
+    response = client.post('/preview', json={'clientName': name})
+    assert response.status_code == 200
+    assert response.get_json()['sections']
+
+
+def test_preview_of_a_numeric_frequency(client):
+    response = client.post('/preview', json={'includeAdvanceTax': 'on', 'advanceTaxFee': '100',
+                                             'advanceTaxFrequency': 5})
+    assert response.status_code == 200
+    rows = [row for section in response.get_json()['sections'] for row in section['rows']]
+    assert next(row for row in rows if row['service'] == 'advanceTaxFee')['frequency'] == '5'
@@ -0,0 +1,24 @@
+PAYLOAD = {'clientCompany': 'Profiled Co', 'proposalDate': '2026-01-04', 'includeTDS': 'on', 'tdsFee': '100'}
+HEADERS = {'X-Profile': '1', 'X-Admin-Token': 'test-token'}
+
+
+def test_profile_requires_token(client):
+    response = client.post('/generate_proposal', json=PAYLOAD, headers={'X-Profile': '1'})
+    assert response.status_code == 403
+
+
+def test_profile_lays_out_despite_caches(client, app_module):
+    # Warm the result and page group caches first
+    assert client.post('/generate_proposal', json=PAYLOAD).status_code == 200
+    misses = app_module.page_group_cache.stats()['misses']
+
+    response = client.post('/generate_proposal', json=PAYLOAD, headers=HEADERS)
+    assert response.status_code == 200 and response.data.startswith(b'%PDF-')
+    assert app_module.page_group_cache.stats()['misses'] == misses
+    profile_id = response.headers['X-Profile-Id']
+    collapsed = client.get(f'/profiles/{profile_id}.collapsed', headers=HEADERS).get_data(as_text=True)
+    summary = client.get(f'/profiles/{profile_id}.txt', headers=HEADERS).get_data(as_text=True)
+    assert 'render_page_group' in summary
+    assert 'render_page_group' in collapsed
+    # Requests after the profile use the caches again
+    assert not app_module.fresh_layout_requested()
@@ -0,0 +1,61 @@
+import os
+import sys
+
+MINIMAL = {'clientName': 'John Smith', 'clientCompany': 'Tiny Co', 'proposalDate': '2026-01-15'}
+
+
+def test_template_files_cover_every_render_module(app_module, client):
+    assert client.post('/generate_proposal', json=MINIMAL).status_code == 200
+    assert client.post('/generate_proposal_word', json=MINIMAL).status_code == 200
+    assert client.post('/preview', json=MINIMAL).status_code == 200
+    imported = {os.path.abspath(module.__file__) for module in list(sys.modules.values())
+                if getattr(module, '__file__', None)
+                and os.path.dirname(os.path.abspath(module.__file__)) == app_module.BASE_DIR}
+    # Neither changes the rendered bytes
+    imported -= {os.path.join(app_module.BASE_DIR, name) for name in ('profiling.py', 'telemetry.py')}
+    assert imported <= set(app_module.TEMPLATE_FILES)
+
+
+def test_cache_key_follows_module_edits(app_module, tmp_path, monkeypatch):
+    module = tmp_path / 'pdf_splice.py'
+    module.write_text('')
+    files = [str(module) if path.endswith('pdf_splice.py') else path for path in app_module.TEMPLATE_FILES]
+    monkeypatch.setattr(app_module, 'TEMPLATE_FILES', files)
+    key = app_module.proposal_cache_key(MINIMAL, 'pdf')
+    assert app_module.proposal_cache_key(MINIMAL, 'pdf') == key
+    stat = module.stat()
+    os.utime(module, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert app_module.proposal_cache_key(MINIMAL, 'pdf') != key
+
+
+def test_repeat_request_is_served_from_cache(app_module, client):
+    payload = dict(MINIMAL, clientName='Cache Hit')
+    first = client.post('/generate_proposal', json=payload)
+    hits = app_module.result_cache.stats()['hits']
+    second = client.post('/generate_proposal', json=payload)
+    assert app_module.result_cache.stats()['hits'] == hits + 1
+    assert second.get_data() == first.get_data()
+
+
+def test_pdf_is_streamed_with_length_and_etag(client):
+    response = client.post('/generate_proposal', json=dict(MINIMAL, clientName='Streamed'))
+    assert response.status_code == 200
+    assert response.is_streamed
+    body = response.get_data()
+    assert response.content_length == len(body)
+    assert body.startswith(b'%PDF-') and body.rstrip().endswith(b'%%EOF')
+    assert response.headers['Content-Disposition'].startswith('attachment; filename=')
+    assert response.headers['ETag']
+
+
+def test_repeated_payload_with_etag_gets_304(client):
+    payload = dict(MINIMAL, clientName='Conditional')
+    first = client.post('/generate_proposal', json=payload)
+    etag = first.headers['ETag']
+    again = client.post('/generate_proposal', json=payload, headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.get_data() == b''
+    changed = client.post('/generate_proposal', json=dict(payload, clientCompany='Other Co'),
+                          headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
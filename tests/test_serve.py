@@ -0,0 +1,87 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def request(port, path, body=None):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(f'http://127.0.0.1:{port}{path}', data=data,
+                                 headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+@pytest.fixture
+def server(tmp_path):
+    """serve.py with two workers that recycle often, and its job directory"""
+    port = free_port()
+    job_dir = tmp_path / 'jobs'
+    env = dict(os.environ, PROPOSAL_LOG_LEVEL='WARNING', PROPOSAL_JOB_DIR=str(job_dir),
+               PROPOSAL_SCRATCH_DIR=str(tmp_path))
+    process = subprocess.Popen([sys.executable, 'serve.py', '--host', '127.0.0.1', '--port', str(port),
+                                '--workers', '2', '--max-requests', '5', '--max-requests-jitter', '0'],
+                               cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                if request(port, '/')[0] == 200:
+                    break
+            except OSError:
+                pass
+            assert process.poll() is None and time.monotonic() < deadline, 'serve.py did not start'
+            time.sleep(0.2)
+        yield port, job_dir
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(60)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def test_jobs_can_be_polled_from_any_worker(server):
+    port, job_dir = server
+    ids = []
+    for n in range(3):
+        status, body = request(port, '/jobs', {'clientCompany': f'Worker Job {n}'})
+        assert status == 202
+        ids.append(json.loads(body)['id'])
+
+    deadline = time.monotonic() + 120
+    while True:
+        statuses = []
+        for job_id in ids:
+            status, body = request(port, f'/jobs/{job_id}')
+            # Every poll is a new connection, answered by whichever worker accepts it
+            assert status == 200
+            statuses.append(json.loads(body)['status'])
+        if all(status == 'done' for status in statuses):
+            break
+        assert 'failed' not in statuses and time.monotonic() < deadline
+        time.sleep(0.3)
+
+    for job_id in ids:
+        status, body = request(port, f'/jobs/{job_id}/result')
+        assert status == 200 and body.startswith(b'%PDF-')
+        assert (job_dir / f'{job_id}.json').exists()
@@ -0,0 +1,21 @@
+import os
+import shutil
+
+
+def test_static_pdf_is_parsed_once_per_version(app_module, tmp_path):
+    path = tmp_path / 'static_pages_2_3_4.pdf'
+    shutil.copy(app_module.STATIC_PAGES_2_3_4, path)
+    cache = app_module.StaticPdfCache()
+    reader = cache.get(str(path))
+    assert cache.get(str(path)) is reader
+    assert len(reader.pages) == 3
+
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert cache.get(str(path)) is not reader
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['reloads']) == (1, 1, 1)
+
+
+def test_missing_static_pdf_is_none(app_module, tmp_path):
+    assert app_module.StaticPdfCache().get(str(tmp_path / 'missing.pdf')) is None